@@ -7,10 +7,16 @@ such that
     r_ITRF = ROTATION_MATRIX * r_stn where r are 3-element column vectors.
 """
 import argparse
+import functools
 import os
 from os.path import dirname
 import numpy as np
 from matplotlib import pyplot as plt
+try:
+    # Registers the '3d' projection once, rather than per plot
+    from mpl_toolkits.mplot3d import Axes3D  # noqa: F401
+except ImportError:
+    pass
 from ilisa.operations.modeparms import str2elementMap2
 
 __version__ = 0.3
@@ -46,7 +52,12 @@ def _getiHBADeltafile(stationName):
     return filepath
 
 
+@functools.lru_cache(maxsize=None)
 def parseAntennaField(stationName):
+    """Parse AntennaField file of stationName.
+
+    The result is cached, so callers should not modify it in-place.
+    """
     filepath = _getAntennaFieldFile(stationName)
     return parseAntennaFieldFile(filepath)
 
@@ -139,8 +150,12 @@ def parseAntennaFieldFile(filename, AFfileNameType=3):
     return antflddata
 
 
+@functools.lru_cache(maxsize=None)
 def parseiHBADeltasfile(stationName):
-    """Parse iHBADelta file."""
+    """Parse iHBADelta file.
+
+    The result is cached, so callers should not modify it in-place.
+    """
     iHBADeltasdata = []
     filepath = _getiHBADeltafile(stationName)
     f = open(filepath)
@@ -355,18 +370,18 @@ def get_tier_layouts(stnid, bandarr, coordsys='local'):
             tier = 'septon'
             elemmap = str2elementMap2(bandarr)
             bandarr = 'HBA'
-        stnpos, stnrot, stnrelpos, stnintilepos = getArrayBandParams(
-            stnid, bandarr)
+        stnpos, stnrot, stnrelpos, stnintilepos = map(
+            np.asarray, getArrayBandParams(stnid, bandarr))
         if coordsys == 'local':
-            stnrelpos = stnrelpos * stnrot
-            stnintilepos = stnintilepos * stnrot
+            stnrelpos = stnrelpos @ stnrot
+            stnintilepos = stnintilepos @ stnrot
         if tier == 'tile':
             _rel_pos = np.asarray(stnintilepos)
             nameprefix = 'elem'
         elif tier == 'septon':
             _rel_pos = np.asarray(stnrelpos)
             for tilenr, elemnr in enumerate(elemmap):
-                _rel_pos[tilenr, :] += np.asarray(stnintilepos[elemnr]).squeeze()
+                _rel_pos[tilenr, :] += stnintilepos[elemnr]
             nameprefix = 'ant'
         else:
             if bandarr == 'HBA':
@@ -405,9 +420,11 @@ def print_layout_pos(pos, names):
 
 
 def plot_layout_pos(pos, names, projection='3d', xyzlbls=('x','y','z'),
-                    title='NoTitle'):
+                    title='NoTitle', labels=True):
     """\
     Plot layout positions
+
+    If labels is False, the element names are not drawn.
     """
     (xlbl, ylbl, zlbl) = xyzlbls
     fig = plt.figure()
@@ -424,13 +441,15 @@ def plot_layout_pos(pos, names, projection='3d', xyzlbls=('x','y','z'),
         ax.plot(pos[:, 0], pos[:, 1], pos[:, 2], '*')
     else:
         ax.plot(pos[:, 0], pos[:, 1], '*')
-    for idx, name in enumerate(names):
-        if projection == '3d':
-            ax.text(pos[idx, 0], pos[idx, 1], pos[idx, 2], '   '+name,
-                    fontsize=4)
-        else:
-            ax.text(pos[idx, 0], pos[idx, 1], '   ' + name, fontsize=4)
-            ax.axis('equal')
+        ax.axis('equal')
+    if labels:
+        # One text artist per element dominates render time for large arrays
+        for idx, name in enumerate(names):
+            if projection == '3d':
+                ax.text(pos[idx, 0], pos[idx, 1], pos[idx, 2], '   '+name,
+                        fontsize=4)
+            else:
+                ax.text(pos[idx, 0], pos[idx, 1], '   ' + name, fontsize=4)
 
     # Plot mean of positions
     geommean = np.mean(pos, axis=0)
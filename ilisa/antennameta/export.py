@@ -5,68 +5,94 @@ other formats such as CASA .cfg files.
 import os
 import datetime
 import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import numpy as np
 from casacore.measures import measures
 from casacore.quanta import quantity
+try:
+    import numba
+    CANUSE_NUMBA = True
+except ImportError:
+    CANUSE_NUMBA = False
 from ilisa.antennameta.antennafieldlib import parseAntennaField, \
-     parseiHBADeltasfile, getArrayBandParams, list_stations, BANDARRS
+     parseiHBADeltasfile, getArrayBandParams, list_stations, BANDARRS, \
+     HBASUBARRS
 
 CASA_CFG_DTYPE = [('X', float), ('Y', float), ('Z', float), ('Diam', float),
                   ('Name', 'U7')]
 CASA_CFG_FMT = '%12f %12f %12f %4.1f %s'
+MAXBASELINES_DTYPE = [('stn', 'U8'), ('LBA', float), ('HBA', float),
+                      ('HBA0', float), ('HBA1', float)]
 CASA_CFG_DEST = os.path.join(os.path.dirname(__file__), 'share/simmos/')
 ALIGNMENT_DEST = os.path.join(os.path.dirname(__file__), 'share/alignment/')
+# Creation time stamp for headers of files exported in this session
+_CREATED_AT = datetime.datetime.utcnow()
 
 
+def _savetxt(filename, table, fmt, header=''):
+    """Save table to text file in the np.savetxt layout, but format it as one
+    string and write it in a single buffered write."""
+    lines = ['# ' + hline for hline in header.split('\n')]
+    lines += [fmt % tuple(row) for row in np.asarray(table)]
+    with open(filename, 'w', buffering=2**20) as fp:
+        fp.write('\n'.join(lines) + '\n')
+
+
+@functools.lru_cache(maxsize=64)
 def _get_casacfg_header(tier, bandarr=None, stnid=None, coordsys=None):
-    """Make a casa config header."""
-    header = "observatory=LOFAR\n"
+    """Make a casa config header.
+
+    Since the creation time stamp is fixed per session, the header only
+    depends on the arguments and so is cached.
+    """
+    lines = ["observatory=LOFAR"]
     columnlabels = "X Y Z Diam Name"
     if tier == 'rot':
-        header += ("station="+stnid+"\n"
-                   + "arrayband="+bandarr+"\n"
-                   + "coordsys=XYZ"+"\n"
-                   + "Rotation matrix (alignment station frame w.r.t. ITRF)"+"\n")
+        lines += ["station="+stnid,
+                  "arrayband="+bandarr,
+                  "coordsys=XYZ",
+                  "Rotation matrix (alignment station frame w.r.t. ITRF)"]
         columnlabels = "x_hat y_hat z_hat"
     else:
-        if tier == 'station':
-            header += ("station=" + stnid + "\n"
-                       + "arrayband=" + bandarr + "\n")
-        elif tier == 'tile' and bandarr == 'HBA':
-            header += ("station=" + stnid + "\n"
-                       + "arrayband=" + bandarr + "\n")
+        if tier == 'station' or (tier == 'tile' and bandarr == 'HBA'):
+            lines += ["station="+stnid, "arrayband="+bandarr]
         if coordsys == 'ITRF':
-            header += "coordsys=XYZ" + "\n"
+            lines.append("coordsys=XYZ")
         elif coordsys.lower().startswith('loc'):
-            header += "coordsys=LOC (local tangent plane)" + "\n"
-    header += ("\n"
-               + "Created with {}\n".format("iLiSA")
-               + "Created at {}\n".format(datetime.datetime.utcnow())
-               + "\n"
-               + columnlabels)
-    return header
+            lines.append("coordsys=LOC (local tangent plane)")
+    lines += ["", "Created with iLiSA", f"Created at {_CREATED_AT}", "",
+              columnlabels]
+    return "\n".join(lines)
 
 
-def output_arrcfg_station(stnid, bandarr, coordsys, output='default'):
+def output_arrcfg_station(stnid, bandarr, coordsys, output='default',
+                          params=None):
     """Output a station array (given by stnid and bandarr) configuration in
     a CASA simmos .cfg format.
+
+    If params is given, it should be the tuple returned by
+    getArrayBandParams(stnid, bandarr), and the antenna field is not reparsed.
     """
-    _pos, stn_rot, stn_relpos, _intile_pos = getArrayBandParams(stnid, bandarr)
+    if params is None:
+        params = getArrayBandParams(stnid, bandarr)
+    _pos, stn_rot, stn_relpos, _intile_pos = params
+    stn_relpos = np.asarray(stn_relpos)
     header = _get_casacfg_header('station', bandarr, stnid, coordsys)
     nrelems = stn_relpos.shape[0]
-    outtable = np.zeros(nrelems, dtype=CASA_CFG_DTYPE)
     if bandarr == 'LBA':
         diam = 1.5
     else:  # bandarr == 'HBA'
         diam = 3.0
-    outtable['X'] = np.squeeze(stn_relpos[:, 0])
-    outtable['Y'] = np.squeeze(stn_relpos[:, 1])
-    outtable['Z'] = np.squeeze(stn_relpos[:, 2])
-    outtable['Diam'] = diam
-    outtable['Name'] = ['ANT'+str(elem) for elem in range(nrelems)]
+    outtable = np.rec.fromarrays(
+        [stn_relpos[:, 0], stn_relpos[:, 1], stn_relpos[:, 2],
+         np.full(nrelems, diam),
+         np.char.add('ANT', np.arange(nrelems).astype('U4'))],
+        dtype=CASA_CFG_DTYPE)
     if output == 'default':
         output = os.path.join(CASA_CFG_DEST, stnid+"_"+bandarr+'.cfg')
-    np.savetxt(output, outtable, fmt=CASA_CFG_FMT, header=header)
+    _savetxt(output, outtable, CASA_CFG_FMT, header=header)
 
 
 def output_arrcfg_tile(stnid, coordsys):
@@ -78,62 +104,106 @@ def output_arrcfg_tile(stnid, coordsys):
     header = _get_casacfg_header('tile', bandarr, stnid, coordsys)
     nrelems = len(hbadeltas)
     diam = 0.5
-    outtable = np.zeros(nrelems, dtype=CASA_CFG_DTYPE)
-    outtable['X'] = hbadeltas[:, 0]
-    outtable['Y'] = hbadeltas[:, 1]
-    outtable['Z'] = hbadeltas[:, 2]
-    outtable['Diam'] = diam
-    outtable['Name'] = ['ELM'+str(elem) for elem in range(nrelems)]
+    outtable = np.rec.fromarrays(
+        [hbadeltas[:, 0], hbadeltas[:, 1], hbadeltas[:, 2],
+         np.full(nrelems, diam),
+         np.char.add('ELM', np.arange(nrelems).astype('U4'))],
+        dtype=CASA_CFG_DTYPE)
     filename = os.path.join(CASA_CFG_DEST, stnid+'_tiles.cfg')
-    np.savetxt(filename, outtable, fmt=CASA_CFG_FMT, header=header)
+    _savetxt(filename, outtable, CASA_CFG_FMT, header=header)
 
 
-def output_rotmat_station(stnid, bandarr, output='default'):
+def output_rotmat_station(stnid, bandarr, output='default', params=None,
+                          binary=False):
     """
     Save a station bandarray's rotation matrix.
     :param stnid: Station ID.
     :param bandarr: 'HBA' or 'LBA'
     :param output: Name of output file. If set to 'default', will use default
                    name convention, i.e. '<stnid>_<bandarr>.txt'.
+    :param params: Output of getArrayBandParams(stnid, bandarr). If None,
+                   it will be computed.
+    :param binary: If True, save matrix as a binary '.npy' file instead of
+                   ASCII, with the header written to a '.hdr' sidecar file.
     """
-    stnpos, stnrot, stnrelpos, stnintilepos = getArrayBandParams(stnid,
-                                                                 bandarr)
+    if params is None:
+        params = getArrayBandParams(stnid, bandarr)
+    stnpos, stnrot, stnrelpos, stnintilepos = params
     if output == 'default':
         output = os.path.join(ALIGNMENT_DEST, '{}_{}.txt'.format(stnid,
                                                                  bandarr))
     header = _get_casacfg_header('rot', bandarr, stnid)
-    np.savetxt(output, stnrot, fmt="%12f %12f %12f", header=header)
+    if binary:
+        outbase = os.path.splitext(output)[0]
+        np.save(outbase + '.npy', np.asarray(stnrot))
+        with open(outbase + '.hdr', 'w') as fp:
+            fp.write(header + '\n')
+    else:
+        _savetxt(output, stnrot, "%12f %12f %12f", header=header)
+
+
+if CANUSE_NUMBA:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _max_baseline_numba(pos):
+        """Max pairwise distance of (N,3) positions without an NxN array."""
+        nrelems = pos.shape[0]
+        maxdist2 = np.zeros(nrelems)
+        for i in numba.prange(nrelems):
+            for j in range(i+1, nrelems):
+                d2 = ((pos[i, 0]-pos[j, 0])**2 + (pos[i, 1]-pos[j, 1])**2
+                      + (pos[i, 2]-pos[j, 2])**2)
+                if d2 > maxdist2[i]:
+                    maxdist2[i] = d2
+        return np.sqrt(maxdist2.max())
+
+
+def _max_baseline(rel_pos):
+    """Max distance between any two positions in (N,3) array rel_pos."""
+    if CANUSE_NUMBA:
+        return _max_baseline_numba(np.ascontiguousarray(rel_pos, dtype=float))
+    # Pairwise squared distances via |xi-xj|^2 = |xi|^2+|xj|^2-2xi.xj
+    sqnorms = np.sum(rel_pos**2, axis=1, keepdims=True)
+    dist2 = sqnorms + sqnorms.T - 2*np.dot(rel_pos, rel_pos.T)
+    return np.sqrt(np.amax(dist2))
 
 
 def max_stn_baselines():
-    """Compute max baseline length of each station."""
+    """Compute max baseline length of each station.
+
+    Returns
+    -------
+    the_maxbaselines : ndarray
+        Structured array with one row per station. Field 'stn' is the
+        station ID and the fields named by band array hold that band
+        array's max baseline in meters, or NaN if it does not exist for the
+        station.
+    """
     stn_id_list = list_stations()
-    the_maxbaselines = {}
+    the_maxbaselines = np.full(len(stn_id_list), np.nan,
+                               dtype=MAXBASELINES_DTYPE)
     for stnnr, stnid in enumerate(stn_id_list):
-        the_maxbaselines[stnid] = {}
+        the_maxbaselines[stnnr]['stn'] = stnid
         ant_fld = parseAntennaField(stnid)
+        # Work on a local mapping since parsed antenna fields are shared
+        rel_pos = {bandarr: np.asarray(ant_fld[bandarr]['REL_POS_X'])
+                   for bandarr in BANDARRS}
         if 'HBA0' in ant_fld:
-            nrelems = len(ant_fld['HBA']['REL_POS_X'])
-            ant_fld['HBA0']['REL_POS_X'] = ant_fld['HBA']['REL_POS_X'][:nrelems//2]
-            ant_fld['HBA1']['REL_POS_X'] = ant_fld['HBA']['REL_POS_X'][nrelems//2:]
-            del ant_fld['HBA']
-        for bandarr in ant_fld.keys():
-            stn_rel_pos = np.array(ant_fld[bandarr]['REL_POS_X'])
-            nrelems = stn_rel_pos.shape[0]
-            absuvwelemnr = []
-            for elemnr in range(nrelems):
-                absuvwelemnr.append(np.amax(np.linalg.norm(
-                    stn_rel_pos - stn_rel_pos[elemnr, :], ord=2, axis=1)))
-            the_maxbaselines[stnid][bandarr] = max(absuvwelemnr)
+            hba_rel_pos = rel_pos.pop('HBA')
+            half = len(hba_rel_pos)//2
+            rel_pos['HBA0'] = hba_rel_pos[:half]
+            rel_pos['HBA1'] = hba_rel_pos[half:]
+        for bandarr, stn_rel_pos in rel_pos.items():
+            the_maxbaselines[stnnr][bandarr] = _max_baseline(stn_rel_pos)
     return the_maxbaselines
 
 
 def print_maxbaselines():
     """print maximum baseline for all stations."""
     m = max_stn_baselines()
-    for k in m.keys():
-        for b in m[k].keys():
-            print(k, b, m[k][b])
+    for row in m:
+        for b in BANDARRS + HBASUBARRS:
+            if not np.isnan(row[b]):
+                print(row['stn'], b, row[b])
 
 
 def ITRF2lonlat(x_itrf, y_itrf, z_itrf):
@@ -211,6 +281,15 @@ def lonlat2ITRF(lon, lat, h='0.0m'):
     return x, y, z
 
 
+def _export_station(stnid, bandarr, coordsys):
+    """Export the cfg and rotation matrix files of a station's band array,
+    and return the station position."""
+    params = getArrayBandParams(stnid, bandarr)
+    output_arrcfg_station(stnid, bandarr, coordsys, params=params)
+    output_rotmat_station(stnid, bandarr, params=params)
+    return np.asarray(params[0]).squeeze()
+
+
 def cli_export():
     """Export AntennaField data for all or selected stations to casa CSV files.
     """
@@ -245,31 +324,31 @@ def cli_export():
             coordsys = 'LOCAL'
 
     the_maxbaselines = max_stn_baselines()
-    for bandarr in bandarrs:
-        header = _get_casacfg_header('ILT', bandarr, coordsys='ITRF')
-        #        if bandarr == 'LBA':
-        #            diam = 55.5
-        #        else:
-        #            diam = 63.3
-        outtable = np.zeros(0, dtype=CASA_CFG_DTYPE)
-        for stnnr, stnid in enumerate(stn_id_list):
-            if stnid == 'NenuFAR' and bandarr == 'HBA':
-                continue
-            row = np.zeros(1, dtype=CASA_CFG_DTYPE)
-            ant_fld = parseAntennaField(stnid)
-            position = ant_fld[bandarr]['POSITION']
-            row['X'], row['Y'], row['Z'] = position
-            try:
-                row['Diam'] = the_maxbaselines[stnid][bandarr]
-            except KeyError:
-                row['Diam'] = the_maxbaselines[stnid]['HBA0']
-            row['Name'] = stnid
-            outtable = np.append(outtable, row)
-            output_arrcfg_station(stnid, bandarr, coordsys)
-            output_rotmat_station(stnid, bandarr)
-        # output array cfg_for ILT for this bandarr:
-        filename = os.path.join(CASA_CFG_DEST, "ILT_" + bandarr + '.cfg')
-        np.savetxt(filename, outtable, fmt=CASA_CFG_FMT, header=header)
+    with ProcessPoolExecutor() as executor:
+        for bandarr in bandarrs:
+            header = _get_casacfg_header('ILT', bandarr, coordsys='ITRF')
+            #        if bandarr == 'LBA':
+            #            diam = 55.5
+            #        else:
+            #            diam = 63.3
+            stnids = [stnid for stnid in stn_id_list
+                      if not (stnid == 'NenuFAR' and bandarr == 'HBA')]
+            # Stations are independent, so export them in parallel
+            positions = executor.map(_export_station, stnids,
+                                     repeat(bandarr), repeat(coordsys))
+            outtable = np.zeros(len(stnids), dtype=CASA_CFG_DTYPE)
+            for stnnr, (stnid, position) in enumerate(zip(stnids, positions)):
+                row = outtable[stnnr]
+                row['X'], row['Y'], row['Z'] = position
+                maxbl = the_maxbaselines[the_maxbaselines['stn'] == stnid][0]
+                diam = maxbl[bandarr]
+                if np.isnan(diam):
+                    diam = maxbl['HBA0']
+                row['Diam'] = diam
+                row['Name'] = stnid
+            # output array cfg_for ILT for this bandarr:
+            filename = os.path.join(CASA_CFG_DEST, "ILT_" + bandarr + '.cfg')
+            _savetxt(filename, outtable, CASA_CFG_FMT, header=header)
 
 
 if __name__ == '__main__':
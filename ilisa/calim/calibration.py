@@ -539,6 +539,21 @@ def gainsolve(cvcobj_uncal, cvcobj_model, wals_variant='legacy', nitr=100):
 import argparse
 
 
+def _dirpath(path):
+    """Check that path is an existing directory, for argparse type."""
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError(
+            "'{}' is not a directory".format(path))
+    return path
+
+
+def _filepath(path):
+    """Check that path is an existing file, for argparse type."""
+    if not os.path.isfile(path):
+        raise argparse.ArgumentTypeError("'{}' is not a file".format(path))
+    return path
+
+
 def solvegains_cli():
     """
     Compute gain solutions for CVC files
@@ -599,8 +614,8 @@ def applygains_cli():
     parser.add_argument('-l', '--legacy_variant', action="store_true",
                         help="""If raised, use legacy cal variant, rather than\
                                 inverse 'inv' variant.""")
-    parser.add_argument('cvcpath', help="Path to CVC folder")
-    parser.add_argument('caltabpath', nargs='?', default='',
+    parser.add_argument('cvcpath', type=_dirpath, help="Path to CVC folder")
+    parser.add_argument('caltabpath', nargs='?', default=None, type=_filepath,
                         help="Path to caltab file")
 
     args = parser.parse_args()
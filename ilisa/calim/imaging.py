@@ -4,6 +4,8 @@ Provides imaging functions for radio interferometric visibilities
 import sys
 import os
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import numpy
 import numpy as np
@@ -11,7 +13,6 @@ import numpy.ma as ma
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
 
-import casacore.measures
 import casacore.quanta.quantity
 
 import ilisa.antennameta.antennafieldlib as antennafieldlib
@@ -31,6 +32,20 @@ except ImportError:
 if CANUSE_DREAMBEAM:
     from dreambeam.polarimetry import convertxy2stokes, cov_lin2cir
     from dreambeam.rime.scenarios import primarybeampat
+try:
+    import numba
+    CANUSE_NUMBA = True
+except ImportError:
+    CANUSE_NUMBA = False
+try:
+    import finufft
+    CANUSE_FINUFFT = True
+except ImportError:
+    CANUSE_FINUFFT = False
+# Min nr of elements for which NUFFT imaging beats the beamform GEMM
+NUFFT_MIN_NRELEMS = 16
+# Max nr of threads computing UVWs over subbands in phaseref_accpol
+MAX_UVW_WORKERS = min(4, os.cpu_count() or 1)
 
 
 def imggrid_res(ll, mm):
@@ -54,54 +69,142 @@ def imggrid_res(ll, mm):
     return dll, dmm
 
 
-def phaseref_accpol(accpol, sbobstimes, freqs, stnPos, antpos, pointing):
+def phaseref_accpol(accpol, sbobstimes, freqs, stnPos, antpos, pointing,
+                    dtype=numpy.complex64):
     """
     Phase up spectral cube of visibilities (ACC) to pointing direction
+
+    Computation is done in complex precision dtype (default single).
     """
-    accphasedup = numpy.zeros(accpol.shape, dtype=complex)
     (pntRA, pntDEC, pntref) = pointing
-    pos_ITRF_X = str(stnPos[0, 0])+'m'
-    pos_ITRF_Y = str(stnPos[1, 0])+'m'
-    pos_ITRF_Z = str(stnPos[2, 0])+'m'
-    # Set up casacore measures object.
-    obsme = casacore.measures.measures()
-    where = obsme.position("ITRF", pos_ITRF_X, pos_ITRF_Y, pos_ITRF_Z)
+    # Get casacore measures object (with station position frame).
+    obsme = vsb._get_measures(stnPos)
     what = obsme.direction(pntref, pntRA+"rad", pntDEC+"rad")
-    obsme.doframe(where)
     obsme.doframe(what)
-    # Set up baselines of the array
+    # Get baselines of the array
     nrant = antpos.shape[0]
-    bl = []
-    for antnr in range(nrant):
-        bl.append(obsme.baseline("ITRF",
-          *[str(comp)+'m' for comp in numpy.asarray(antpos[antnr, :]).squeeze()
-           ])
-        )
-    # Step through subbands & phase up autocovariance matrix to point direction
-    for sb in range(len(sbobstimes)):
-        sys.stdout.write("\rsb: {}/511".format(sb))
-        sys.stdout.flush()
-        when = obsme.epoch("UTC", sbobstimes[sb].isoformat('T'))
-        obsme.doframe(when)
-        UVWxyz = numpy.zeros((nrant,3))
-        for antnr in range(nrant):
-            UVWxyz[antnr,:] = numpy.asarray(
-                obsme.to_uvw(bl[antnr])["xyz"].get_value('m'))
-        lambda0 = sys.float_info.max
-        if freqs[sb] != 0.0:
-            lambda0 = c/freqs[sb]
-        # Compute phase factors. w-direction (component 2) is towards pointing
-        phasefactors = numpy.exp(-2.0j*numpy.pi*UVWxyz[:, 2]/lambda0)
-        PP = numpy.einsum('i,j->ij', phasefactors, numpy.conj(phasefactors))
-        accphasedup[sb, 0, 0, :, :] = PP*accpol[sb, 0, 0, :, :]
-        accphasedup[sb, 0, 1, :, :] = PP*accpol[sb, 0, 1, :, :]
-        accphasedup[sb, 1, 0, :, :] = PP*accpol[sb, 1, 0, :, :]
-        accphasedup[sb, 1, 1, :, :] = PP*accpol[sb, 1, 1, :, :]
+    bl = vsb._get_baselines(obsme, antpos)
+    # Step through subbands & compute w-components of array at each obstime
+    nrsbs = len(sbobstimes)
+    w_sb_ant = numpy.zeros((nrsbs, nrant))
+
+    def _w_sbs(sbs):
+        # Each worker thread uses its own measures object (not thread-safe)
+        _obsme = vsb._get_measures(stnPos)
+        _obsme.doframe(what)
+        for sb in sbs:
+            when = _obsme.epoch("UTC", sbobstimes[sb].isoformat('T'))
+            _obsme.doframe(when)
+            for antnr in range(nrant):
+                # Only the w-component is needed
+                w_sb_ant[sb, antnr] = _obsme.to_uvw(bl[antnr])["xyz"
+                                                    ].get_value('m')[2]
+    nrworkers = max(1, min(MAX_UVW_WORKERS, nrsbs))
+    with ThreadPoolExecutor(max_workers=nrworkers) as executor:
+        # Chunks of 32 subbands, so progress can be reported (throttled,
+        # since flushing every sb stalls over ssh) as each chunk completes
+        sbchunks = [numpy.arange(nrsbs)[i:i+32] for i in range(0, nrsbs, 32)]
+        futures = {executor.submit(_w_sbs, sbs): len(sbs) for sbs in sbchunks}
+        nrsbsdone = 0
+        for future in as_completed(futures):
+            # Get result so that exceptions in workers are raised here
+            future.result()
+            nrsbsdone += futures[future]
+            sys.stdout.write("\rsb: {}/{}".format(nrsbsdone, nrsbs))
+            sys.stdout.flush()
+    # Compute phase factors. w-direction (component 2) is towards pointing.
+    # (Using wavenumber f/c, rather than 1/lambda, handles f=0 subbands.)
+    wavenrs = numpy.asarray(freqs) / c
+    phasefactors = numpy.exp(-2.0j*numpy.pi*w_sb_ant*wavenrs[:, numpy.newaxis]
+                             ).astype(dtype, copy=False)
+    # Phase up all subbands & pols of autocovariance matrix to point direction
+    accphasedup = (accpol.astype(dtype, copy=False)
+                   * phasefactors[:, numpy.newaxis, numpy.newaxis, :,
+                                  numpy.newaxis]
+                   * numpy.conj(phasefactors)[:, numpy.newaxis, numpy.newaxis,
+                                              numpy.newaxis, :])
     return accphasedup
 
 
+def _beamform_matrix(ll, mm, pos_u, pos_v, k):
+    """\
+    Beamform matrix exp(-i*k*(l*u+m*v)) over flattened pixels (rows) and
+    elements (columns), i.e. a C-contiguous (nrpix**2, nrelems) array.
+    """
+    phase = k*(numpy.multiply.outer(ll.ravel(), pos_u)
+               + numpy.multiply.outer(mm.ravel(), pos_v))
+    return numpy.exp(-1.j*phase)
+
+
+def _get_beamform_matrix(lmext, nrpix, pos_u, pos_v, k, dtype):
+    """\
+    Get beamform matrix over regular lm grid of nrpix**2 pixels with extent
+    lmext, memoized since imaging loops often reuse the same freq & layout.
+    The returned array is read-only.
+    """
+    pos_uv = numpy.array([numpy.asarray(pos_u, dtype=float).ravel(),
+                          numpy.asarray(pos_v, dtype=float).ravel()])
+    return _beamform_matrix_cached(float(lmext), int(nrpix), pos_uv.tobytes(),
+                                   float(k), numpy.dtype(dtype))
+
+
+@functools.lru_cache(maxsize=8)
+def _beamform_matrix_cached(lmext, nrpix, pos_uv_bytes, k, dtype):
+    pos_u, pos_v = numpy.frombuffer(pos_uv_bytes).reshape(2, -1)
+    l = numpy.linspace(-lmext, lmext, nrpix)
+    ll, mm = numpy.meshgrid(l, l)
+    bf = _beamform_matrix(ll, mm, pos_u, pos_v, k).astype(dtype, copy=False)
+    bf.setflags(write=False)
+    return bf
+
+
+def _bf_power(bf_1, vis, bf_2_conj=None, hermitian=False):
+    """\
+    Beamformed power img[p] = sum_kl bf_1[p,k]*vis[k,l]*bf_2_conj[p,l]
+
+    If hermitian and vis is Hermitian (bf_2 is then assumed to be bf_1) the
+    image is real, so the reduction is done in real arithmetic without
+    forming conj(bf_1).
+    """
+    bfvis = bf_1 @ vis
+    if hermitian and numpy.allclose(vis, vis.conj().T):
+        return (numpy.einsum('pk,pk->p', bfvis.real, bf_1.real)
+                + numpy.einsum('pk,pk->p', bfvis.imag, bf_1.imag))
+    if bf_2_conj is None:
+        bf_2_conj = numpy.conj(bf_1)
+    return numpy.einsum('pk,pk->p', bfvis, bf_2_conj)
+
+
+def _beamformed_image_nufft(vis, pos_u, pos_v, k, dll, dmm, nrpix):
+    """\
+    Image visibility stack vis[pol,k,l] on regular, centered l,m grid via
+    type-1 NUFFT over the baseline phases -k*(l*(u_k-u_l)+m*(v_k-v_l)).
+    Returns flattened images as array[pol, nrpix**2].
+    """
+    nrpols, nrelems = vis.shape[0], vis.shape[-1]
+    pos_u, pos_v = numpy.asarray(pos_u).ravel(), numpy.asarray(pos_v).ravel()
+    bl_u = numpy.subtract.outer(pos_u, pos_u).ravel()
+    bl_v = numpy.subtract.outer(pos_v, pos_v).ravel()
+    # l = dll*(q+offset) with integer mode q in [-nrpix//2, (nrpix-1)//2]
+    offset = nrpix//2 - (nrpix-1)/2
+    x_m = -k*dmm*bl_v
+    y_l = -k*dll*bl_u
+    coeffs = (vis.reshape(nrpols, nrelems*nrelems)
+              * numpy.exp(1.j*offset*(x_m+y_l)).astype(vis.dtype, copy=False))
+    # Mode sums are 2*pi periodic so wrap phases into [-pi, pi)
+    x_m = numpy.mod(x_m+numpy.pi, 2*numpy.pi) - numpy.pi
+    y_l = numpy.mod(y_l+numpy.pi, 2*numpy.pi) - numpy.pi
+    rdtype = numpy.finfo(vis.dtype).dtype
+    eps = 1e-6 if rdtype == numpy.float32 else 1e-12
+    imgs = finufft.nufft2d1(x_m.astype(rdtype), y_l.astype(rdtype),
+                            numpy.ascontiguousarray(coeffs), (nrpix, nrpix),
+                            eps=eps, isign=1)
+    return imgs.reshape(nrpols, nrpix*nrpix)
+
+
 def beamformed_image(xstpol, stn2Dcoord, freq, lmsize=2.0, nrpix=101,
-                     polrep='linear', fluxperbeam=True, fov_area=0.0):
+                     polrep='linear', fluxperbeam=True, fov_area=0.0,
+                     dtype=numpy.complex64):
     """
     Beamformed image XSTpol data.
 
@@ -131,6 +234,8 @@ def beamformed_image(xstpol, stn2Dcoord, freq, lmsize=2.0, nrpix=101,
     fov_area: float
         Field-of-view size. It is used to convert flux to flux per beam.
         If set to None, then it is not used.
+    dtype : numpy dtype
+        Complex precision used for imaging. Default is single precision.
 
     Returns
     -------
@@ -151,7 +256,7 @@ def beamformed_image(xstpol, stn2Dcoord, freq, lmsize=2.0, nrpix=101,
     # (factor 2*2 is the 2*2 pol. correlations):
     nrbls = xstpol_flagged.count()/(2*2)
     # Fill flagged values with 0.0:
-    xstpol = ma.filled(xstpol_flagged, 0.0)
+    xstpol = ma.filled(xstpol_flagged, 0.0).astype(dtype, copy=False)
 
     # Weighting
     nrelems = xstpol.shape[-1]
@@ -182,47 +287,50 @@ def beamformed_image(xstpol, stn2Dcoord, freq, lmsize=2.0, nrpix=101,
         elif np.allclose(stn2Dcoord_X, stn2Dcoord_Y):
             _XYcoord_same = True
     posU_X, posV_X = stn2Dcoord_X[:, 0].squeeze(), stn2Dcoord_X[:, 1].squeeze()
-    bf_X = numpy.exp(-1.j*k*(numpy.einsum('ij,k->ijk', ll, posU_X)
-                           + numpy.einsum('ij,k->ijk', mm, posV_X)))
-    bf_Y = bf_X  # Default: make Y beamform matrix same as X
+    # NUFFT imaging only pays off over beamform GEMM for large arrays
+    use_nufft = (_XYcoord_same and CANUSE_FINUFFT and nrpix > 1
+                 and nrelems >= NUFFT_MIN_NRELEMS)
+    if not use_nufft:
+        bf_X = _get_beamform_matrix(lmext, nrpix, posU_X, posV_X, k, dtype)
+        bf_Y = bf_X  # Default: make Y beamform matrix same as X
     if not _XYcoord_same:
         # Add separate beamform matrix for Y
         posU_Y, posV_Y = stn2Dcoord_Y[0, :].squeeze(), stn2Dcoord_Y[1, :].squeeze()
-        bf_Y = numpy.exp(-1.j*k*(numpy.einsum('ij,k->ijk', ll, posU_Y)
-                               + numpy.einsum('ij,k->ijk', mm, posV_Y)))
-    bfXbfX = numpy.einsum('ijk,ijl->ijkl', bf_X, numpy.conj(bf_X))
-    # Default: set image matrix with combinations containing Y to XX image matrx
-    bfXbfY = bfXbfX
-    bfYbfX = bfXbfX
-    bfYbfY = bfXbfX
-    if not _XYcoord_same:
-        # Add separate imaging matrix for combinations with Y
-        bfXbfY = numpy.einsum('ijk,ijl->ijkl', bf_X, numpy.conj(bf_Y))
-        bfYbfX = numpy.einsum('ijk,ijl->ijkl', bf_Y, numpy.conj(bf_X))
-        bfYbfY = numpy.einsum('ijk,ijl->ijkl', bf_Y, numpy.conj(bf_Y))
-
+        bf_Y = _get_beamform_matrix(lmext, nrpix, posU_Y, posV_Y, k, dtype)
+    # Image over flattened pixels p: img[p] = sum_kl bf[p,k]*vis[k,l]*bf[p,l]^*
+    # computed as (bf @ vis) . bf^* to use a GEMM rather than bf*bf^* tensor.
+    # Keep vis C-contiguous, (pol, pol, elem, elem), so each pol block handed
+    # to BLAS is contiguous even if xstpol came in with other strides.
+    vis_w = numpy.ascontiguousarray(w*xstpol)
+    if use_nufft:
+        dll, dmm = imggrid_res(ll, mm)
+        skyimags = _beamformed_image_nufft(vis_w.reshape(4, nrelems, nrelems),
+                                           posU_X, posV_X, k, dll, dmm, nrpix)
+    elif _XYcoord_same:
+        # Batch all 4 pols into one GEMM: bf @ [vis_xx vis_xy vis_yx vis_yy]
+        vis_stack = numpy.transpose(vis_w.reshape(4, nrelems, nrelems),
+                                    (1, 0, 2)).reshape(nrelems, 4*nrelems)
+        bfvis = (bf_X @ vis_stack).reshape(-1, 4, nrelems)
+        skyimags = numpy.einsum('pqk,pk->qp', bfvis, numpy.conj(bf_X))
+    else:
+        bfs = (bf_X, bf_Y)
+        bfs_conj = (numpy.conj(bf_X), numpy.conj(bf_Y))
+        skyimags = numpy.array([
+            _bf_power(bfs[polidx1], vis_w[polidx1, polidx2], bfs_conj[polidx2],
+                      hermitian=(polidx1 == polidx2))
+            for polidx1 in range(2) for polidx2 in range(2)])
     nrm = nrbls
     if fov_area:
         nrm *= fov_area
-    skyimag_xx = (numpy.einsum('ijkl,kl->ij', bfXbfX,
-                               w[0, 0, ...]*xstpol[0, 0, ...].squeeze()) / nrm)
-    skyimag_xy = (numpy.einsum('ijkl,kl->ij', bfXbfY,
-                               w[0, 1, ...]*xstpol[0, 1, ...].squeeze()) / nrm)
-    skyimag_yx = (numpy.einsum('ijkl,kl->ij', bfYbfX,
-                               w[1, 0, ...]*xstpol[1, 0, ...].squeeze()) / nrm)
-    skyimag_yy = (numpy.einsum('ijkl,kl->ij', bfYbfY,
-                               w[0, 1, ...]*xstpol[1, 1, ...].squeeze()) / nrm)
+    skyimags = skyimags.reshape((4, nrpix, nrpix)) / nrm
     if not fluxperbeam:
-        ll2mm2 = ll**2+mm**2
-        beyond_horizon = ll2mm2 > 1.0
-        #ll2mm2[beyond_horizon] = 1.0  # Avoids warning for complex nn
-        nn = numpy.sqrt(1-ll2mm2)
+        ll2mm2 = ll*ll + mm*mm
+        # Real n-component; clamping avoids sqrt of negatives beyond horizon
+        nn = numpy.sqrt(numpy.maximum(1.0 - ll2mm2, 0.0))
         # Weight values beyond horizon to one
-        nn[beyond_horizon] = 1.0
-        skyimag_xx = skyimag_xx * nn
-        skyimag_xy = skyimag_xy * nn
-        skyimag_yx = skyimag_yx * nn
-        skyimag_yy = skyimag_yy * nn
+        nn[ll2mm2 > 1.0] = 1.0
+        skyimags = skyimags * nn.astype(numpy.finfo(dtype).dtype, copy=False)
+    skyimag_xx, skyimag_xy, skyimag_yx, skyimag_yy = skyimags
     (skyimag_0, skyimag_1, skyimag_2, skyimag_3) = (None, None, None, None)
     if not CANUSE_DREAMBEAM or polrep == 'linear':
         (skyimag_0, skyimag_1, skyimag_2, skyimag_3) =\
@@ -242,14 +350,42 @@ def beamformed_image(xstpol, stn2Dcoord, freq, lmsize=2.0, nrpix=101,
     return (skyimag_0, skyimag_1, skyimag_2, skyimag_3), ll, mm
 
 
-def nearfield_grd_image(cvcobj, filestep, cubeslice, use_autocorr=False):
+if CANUSE_NUMBA:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _nearfield_kernel(xf, yf, pos_u, pos_v, vis, k):
+        """\
+        Near-field beamformed power sum_ij e_i*V_ij*conj(e_j), with
+        e_i = exp(-i*k*r_i), for each flattened ground pixel.
+        """
+        nrpix = xf.shape[0]
+        nrelems = pos_u.shape[0]
+        out = numpy.empty(nrpix, dtype=vis.dtype)
+        for p in numba.prange(nrpix):
+            bf = numpy.empty(nrelems, dtype=vis.dtype)
+            for i in range(nrelems):
+                ri = numpy.sqrt((xf[p]-pos_u[i])**2 + (yf[p]-pos_v[i])**2)
+                bf[i] = numpy.cos(k*ri) - 1.j*numpy.sin(k*ri)
+            acc = 0.j
+            for i in range(nrelems):
+                rowsum = 0.j
+                for j in range(nrelems):
+                    rowsum += vis[i, j]*numpy.conj(bf[j])
+                acc += bf[i]*rowsum
+            out[p] = acc
+        return out
+
+
+def nearfield_grd_image(cvcobj, filestep, cubeslice, use_autocorr=False,
+                        dtype=numpy.complex64):
     """
     Make a nearfield image along the ground from Stokes I visibility.
-    (Useful for RFI).
+    (Useful for RFI). Computation is done in complex precision dtype.
     """
     freq = cvcobj.freqset[filestep][cubeslice]
     cvcpol_lin = vsb.cov_flat2polidx(cvcobj[filestep])
-    vis_S0 = cvcpol_lin[cubeslice, 0, 0, ...] + cvcpol_lin[cubeslice, 1, 1, ...]
+    vis_S0 = numpy.ascontiguousarray(cvcpol_lin[cubeslice, 0, 0, ...]
+                                     + cvcpol_lin[cubeslice, 1, 1, ...],
+                                     dtype=dtype)
     stn_antpos = cvcobj.stn_antpos
     if not use_autocorr:
         numpy.fill_diagonal(vis_S0[: ,:], 0.0)
@@ -262,13 +398,19 @@ def nearfield_grd_image(cvcobj, filestep, cubeslice, use_autocorr=False):
     x = numpy.linspace(-r_ext, r_ext, nrpix)
     y = numpy.linspace(-r_ext, r_ext, nrpix)
     xx, yy = numpy.meshgrid(x,y)
-    xx1 = xx[..., numpy.newaxis]
-    yy1 = yy[..., numpy.newaxis]
-    rvec = numpy.array([xx1 - pos_u, yy1 - pos_v])
-    r = numpy.linalg.norm(rvec, axis=0)
-    bf = numpy.exp(-1.j*k*r)
-    bfbf = numpy.einsum('ijk,ijl->ijkl', bf, numpy.conj(bf))
-    nfhimage = numpy.einsum('ijkl,kl->ij', bfbf, vis_S0)
+    if CANUSE_NUMBA:
+        nfhimage = _nearfield_kernel(
+            xx.ravel(), yy.ravel(),
+            numpy.ascontiguousarray(pos_u, dtype=float),
+            numpy.ascontiguousarray(pos_v, dtype=float),
+            vis_S0, k
+            ).reshape(xx.shape)
+    else:
+        # Distance from each (flattened) ground pixel to each element
+        r = numpy.hypot(numpy.subtract.outer(xx.ravel(), pos_u),
+                        numpy.subtract.outer(yy.ravel(), pos_v))
+        bf = numpy.exp(-1.j*k*r).astype(dtype, copy=False)
+        nfhimage = _bf_power(bf, vis_S0, hermitian=True).reshape(xx.shape)
     blankimage = numpy.zeros(nfhimage.shape)
     nfhimage = numpy.real(nfhimage)
     nfimages = (nfhimage, blankimage, blankimage, blankimage)
@@ -301,11 +443,11 @@ def accpol2bst(accpol, sbobstimes, freqs, stn_pos, stn_antpos, pointing,
     # Sum up phased up ACCs per pol component over all baselines (Previously
     #  average)
     # Note that this sum is also over conjugate baselines, so factor 2 more
-    bstXX = numpy.sum(numpy.real(accpu[:, 0, 0, ...].squeeze()), axis=(1, 2)
-                      )/nrbaselinestot
-    bstXY = numpy.sum(accpu[:, 0, 1, ...].squeeze(), axis=(1, 2))/nrbaselinestot
-    bstYY = numpy.sum(numpy.real(accpu[:, 1, 1, ...].squeeze()), axis=(1, 2)
-                      )/nrbaselinestot
+    # (accpu is ordered (sb, pol, pol, ant, ant) so each reduce is per sb over
+    #  a contiguous ant x ant block)
+    bstXX = accpu[:, 0, 0].real.sum(axis=(1, 2))/nrbaselinestot
+    bstXY = accpu[:, 0, 1].sum(axis=(1, 2))/nrbaselinestot
+    bstYY = accpu[:, 1, 1].real.sum(axis=(1, 2))/nrbaselinestot
     return bstXX, bstXY, bstYY
 
 
@@ -373,6 +515,7 @@ def plotskyimage(ll, mm, skyimages, polrep, t, freq, stnid, integration,
     pbeamfld = (ll**2+mm**2<0.75**2)  # Primary beam field (used for color
                                     # scaling, thus choosen slightly larger
                                     # than 0.5)
+    pb_idx = numpy.flatnonzero(pbeamfld)  # Flat index to pbeamfld, reused
 
     xlabel = 'Easting (dir. cos) []'
     ylabel = 'Northing (dir. cos) []'
@@ -386,8 +529,9 @@ def plotskyimage(ll, mm, skyimages, polrep, t, freq, stnid, integration,
             # Avoid horizon:
             compmap = numpy.ma.masked_where(hrzrgn, compmap)
         plt.subplot(2, 2, pos+1)
-        vmax = numpy.amax(compmap[pbeamfld])
-        vmin = numpy.amin(compmap[pbeamfld])
+        # (pbeamfld is within horizon so there is no need to account mask)
+        compmap_pb = numpy.asarray(compmap).ravel()[pb_idx]
+        vmax, vmin = compmap_pb.max(), compmap_pb.min()
         plt.imshow(compmap, origin='lower', extent=[lmin, lmax, mmin, mmax],
                    interpolation='none', cmap=plt.get_cmap("jet"),
                    vmax=vmax, vmin=vmin)
@@ -482,9 +626,13 @@ def pntsrc_hmsph(*pntsrcs, imsize=101):
     img_S1 = numpy.zeros(ll.shape)
     img_S2 = numpy.zeros(ll.shape)
     img_S3 = numpy.zeros(ll.shape)
+    # Grid is regular so nearest pixel index follows directly from position
+    def _nearest_idx(x):
+        idx = int(round((x+lmext)/(2*lmext)*(imsize-1)))
+        return min(max(idx, 0), imsize-1)
     for pntsrc in pntsrcs:
-        lidx = numpy.argmin(numpy.abs(l-pntsrc[0]))
-        midx = numpy.argmin(numpy.abs(m-pntsrc[1]))
+        lidx = _nearest_idx(pntsrc[0])
+        midx = _nearest_idx(pntsrc[1])
         img_S0[lidx, midx] = pntsrc[2]
     return ll, mm, (img_S0, img_S1, img_S2, img_S3)
 
@@ -631,13 +779,13 @@ def image(dataff, filenr, sampnr, phaseref, correctpb, fluxpersterradian,
             'LOFAR', stnid, bandarr, 'Hamaker', freq, pointing=pointing,
             obstime=t, lmgrid=(ll, mm))
         ijones = numpy.linalg.inv(jonesfld)
-        bri_ant = numpy.array([[imgs_lin[0], imgs_lin[1]],
-                               [imgs_lin[2], imgs_lin[3]]])
-
-        bri_ant = numpy.moveaxis(numpy.moveaxis(bri_ant, 0, -1), 0, -1)
-
-        ijonesH = numpy.conj(numpy.swapaxes(ijones, -1, -2))
-        bri_xy_iau = numpy.matmul(numpy.matmul(ijones, bri_ant), ijonesH)
+        # Brightness matrix with pol indices last, i.e. (nrpix, nrpix, 2, 2)
+        bri_ant = numpy.stack([numpy.stack([imgs_lin[0], imgs_lin[1]], -1),
+                               numpy.stack([imgs_lin[2], imgs_lin[3]], -1)],
+                              -2)
+        # Apply ijones * bri_ant * ijones^H per pixel
+        bri_xy_iau = numpy.einsum('xyab,xybc,xydc->xyad', ijones, bri_ant,
+                                  numpy.conj(ijones), optimize=True)
         imgs_lin = (bri_xy_iau[:, :, 0, 0], bri_xy_iau[:, :, 0, 1],
                     bri_xy_iau[:, :, 1, 0], bri_xy_iau[:, :, 1, 1])
 
@@ -1,7 +1,9 @@
 import datetime
 import sys
+import threading
 
 import casacore.measures
+import casacore.quanta
 import numpy
 import numpy as np
 
@@ -15,6 +17,63 @@ except ImportError:
     canuse_dreambeam = False
 if canuse_dreambeam:
     from dreambeam.polarimetry import cov_lin2cir, convertxy2stokes
+try:
+    import numba
+    canuse_numba = True
+except ImportError:
+    canuse_numba = False
+
+
+# Cache of casacore measures objects with station position frame already set.
+# Measures objects are not thread-safe so each thread has its own cache.
+_MEAS_LOCAL = threading.local()
+
+
+def _get_measures(stn_pos):
+    """\
+    Get a casacore measures object with frame set to ITRF station position
+
+    The object is cached per station position and thread, so callers should
+    only set the direction & epoch frames on it.
+    """
+    stn_pos = numpy.asarray(stn_pos, dtype=float).ravel()
+    key = stn_pos.tobytes()
+    meas_cache = getattr(_MEAS_LOCAL, 'cache', None)
+    if meas_cache is None:
+        meas_cache = _MEAS_LOCAL.cache = {}
+    obsme = meas_cache.get(key)
+    if obsme is None:
+        obsme = casacore.measures.measures()
+        where = obsme.position("ITRF", *[str(comp)+'m'
+                                         for comp in stn_pos[:3]])
+        obsme.doframe(where)
+        meas_cache[key] = obsme
+    return obsme
+
+
+# Cache of casacore ITRF baseline measures per antenna layout.
+_BASELINE_CACHE = {}
+_BASELINE_CACHE_LOCK = threading.Lock()
+
+
+def _get_baselines(obsme, stn_antpos):
+    """\
+    Get list of casacore ITRF baseline measures for antenna positions
+
+    The baselines do not depend on the frame, so they are built once per
+    layout directly from the position values (no str formatting) & cached.
+    """
+    stn_antpos = numpy.asarray(stn_antpos, dtype=float)
+    key = (stn_antpos.shape, stn_antpos.tobytes())
+    with _BASELINE_CACHE_LOCK:
+        bls = _BASELINE_CACHE.get(key)
+        if bls is None:
+            bls = [obsme.baseline("ITRF",
+                                  *[casacore.quanta.quantity(comp, 'm')
+                                    for comp in antpos])
+                   for antpos in stn_antpos.tolist()]
+            _BASELINE_CACHE[key] = bls
+    return bls
 
 
 def fiducial_visibility(nrelems=2):
@@ -116,7 +175,23 @@ def cov_polidx2flat(cvcpol, parity_ord=True):
     return cvcflat
 
 
-def cov_flat2polidx(cvc, parity_ord=True):
+if canuse_numba:
+    @numba.njit(parallel=True, cache=True)
+    def _split_parity_pols(cvc, cvpol):
+        """\
+        Copy parity ordered (M, 2*N, 2*N) cvc into (M, 2, 2, N, N) cvpol in
+        one pass, reading cvc row by row.
+        """
+        n = cvpol.shape[-1]
+        for m in numba.prange(cvc.shape[0]):
+            for i in range(n):
+                for p in range(2):
+                    for j in range(n):
+                        cvpol[m, p, 0, i, j] = cvc[m, 2*i+p, 2*j]
+                        cvpol[m, p, 1, i, j] = cvc[m, 2*i+p, 2*j+1]
+
+
+def cov_flat2polidx(cvc, parity_ord=True, copy=True):
     """
     Convert flat array covariance matrix (visibilities) to polarization
     component indexed array covariance matrix.
@@ -131,6 +206,10 @@ def cov_flat2polidx(cvc, parity_ord=True):
         the index's parity: even index maps to component 0, odd to 1.
         If False the baseline indices are split into a first and second half
         and mapped to pol component 0,1 respectively.
+    copy : Boolean
+        If True (default) the result is a new contiguous array. If False it
+        is a strided view into `cvc` (when `cvc` is an array whose last two
+        axes can be split without copying), so no data is moved.
 
     Returns
     -------
@@ -180,22 +259,31 @@ def cov_flat2polidx(cvc, parity_ord=True):
     --------
     cov_polidx2flat : Inverse function.
     """
+    cvc = numpy.asarray(cvc)
+    n = cvc.shape[-1]//2
+    restshape = cvc.shape[:-2]
+    nrrest = len(restshape)
+    if (canuse_numba and copy and parity_ord and cvc.dtype.kind in 'iufc'
+            and cvc.shape[-1] == 2*n):
+        # Fused single-pass split over all samples
+        cvc3 = cvc.reshape((-1,) + cvc.shape[-2:])
+        cvpol = numpy.empty((cvc3.shape[0], 2, 2, n, n), dtype=cvc.dtype)
+        _split_parity_pols(cvc3, cvpol)
+        return cvpol.reshape(restshape + (2, 2, n, n))
+    # Split each flat index into its (element, pol) or (pol, element) pair
+    # and put the pol axes just before the element axes:
     if parity_ord:
-        pp = cvc[..., ::2, ::2]
-        qq = cvc[..., 1::2, 1::2]
-        pq = cvc[..., ::2, 1::2]
-        qp = cvc[..., 1::2, ::2]
+        cvcsplit = cvc.reshape(restshape + (n, 2, n, 2))
+        polelemaxes = (nrrest+1, nrrest+3, nrrest, nrrest+2)
     else:
         # First-half, second-half order
-        n = cvc.shape[-1]//2
-        pp = cvc[..., :n, :n]
-        qq = cvc[..., n:, n:]
-        pq = cvc[..., :n, n:]
-        qp = cvc[..., n:, :n]
-    cvpol = numpy.array([[pp, pq], [qp, qq]])
-    # Move pol-axes from leftmost axises rightward just before element indexes:
-    cvpol = numpy.moveaxis(cvpol, 1, -3)
-    cvpol = numpy.moveaxis(cvpol, 0, -4)
+        cvcsplit = cvc.reshape(restshape + (2, n, 2, n))
+        polelemaxes = (nrrest, nrrest+2, nrrest+1, nrrest+3)
+    cvpol = cvcsplit.transpose(tuple(range(nrrest)) + polelemaxes)
+    if copy:
+        # One copy into a contiguous array, so each pol component is
+        # unit-stride
+        cvpol = numpy.array(cvpol, order='C')
     return cvpol
 
 
@@ -274,23 +362,13 @@ def calc_uvw(obstime, phaseref, stn_pos, stn_antpos):
         UVW coordinates in meters.
     """
     (pntRA, pntDEC, pntref) = phaseref
-    pos_ITRF_X = str(stn_pos[0].squeeze())+'m'
-    pos_ITRF_Y = str(stn_pos[1].squeeze())+'m'
-    pos_ITRF_Z = str(stn_pos[2].squeeze())+'m'
-    # Set up casacore measures object.
-    obsme = casacore.measures.measures()
-    where = obsme.position("ITRF", pos_ITRF_X, pos_ITRF_Y, pos_ITRF_Z)
+    # Get casacore measures object (with station position frame).
+    obsme = _get_measures(stn_pos)
     what = obsme.direction(pntref, str(pntRA)+"rad", str(pntDEC)+"rad")
-    obsme.doframe(where)
     obsme.doframe(what)
-    # Set up baselines of the array
+    # Get baselines of the array
     nrant = stn_antpos.shape[0]
-    bls = []
-    for antnr in range(nrant):
-        bl = obsme.baseline("ITRF",
-                            *[str(comp)+'m' for comp in
-                              numpy.asarray(stn_antpos[antnr, :]).squeeze()])
-        bls.append(bl)
+    bls = _get_baselines(obsme, stn_antpos)
     uvw_xyz = numpy.zeros((nrant,3))
     # Set obstime
     if type(obstime) is np.datetime64:
@@ -354,23 +432,24 @@ def rm_redundant_bls(cvc, rmconjbl=True, use_autocorr=False):
     # Total number of baselines incl. autocorr and conjugate baselines.
     nrbaselinestot = nrelems**2
     if rmconjbl:
-        # Remove conjugate baselines
-        for idx_i in range(1, nrelems):
-            for idx_j in range(idx_i):
-                cvc[..., idx_i, idx_j] = 0.0
-        nrbaselinestot -= nrelems*(nrelems-1)/2
+        # Remove conjugate baselines, i.e. zero strictly lower triangle
+        idx_i, idx_j = numpy.tril_indices(nrelems, k=-1)
+        cvc[..., idx_i, idx_j] = 0.0
+        nrbaselinestot -= nrelems*(nrelems-1)//2
     if not use_autocorr:
         # Do not use the autocorrelations (for all pol combos
         # i.e. for XX, YY, XY and YX)
-        for idx in range(nrelems):
-            cvc[..., idx, idx] = 0.0
+        idx = numpy.arange(nrelems)
+        cvc[..., idx, idx] = 0.0
         nrbaselinestot -= nrelems
     return cvc, nrbaselinestot
 
 
-def phaseref_xstpol(xstpol, UVWxyz, freq):
+def phaseref_xstpol(xstpol, UVWxyz, freq, dtype=numpy.complex64):
     """
     Phase up polarized visibilities stack to U,V-align them at frequency
+
+    Computation is done in complex precision dtype (default single).
     """
     lambda0 = sys.float_info.max
     if freq != 0.0:
@@ -378,12 +457,11 @@ def phaseref_xstpol(xstpol, UVWxyz, freq):
     # Phase-factor corresponds to exp(-i*2*pi*W/lambda),
     # this is so that B(l,m)*exp(i*2*pi*(U*l+V*m+W*n)/lambda)*phasefactor=
     #   B(l,m)*exp(i*2*pi*(U*l+V*m+W*(n-1))/lambda) which
-    phasefactors = numpy.exp(-2.0j*numpy.pi*UVWxyz[:,2]/lambda0)
-    PP = numpy.einsum('i,k->ik', phasefactors, numpy.conj(phasefactors))
-    #xstpupol = numpy.array(
-    #       [[PP*xstpol[0, 0, ...].squeeze(), PP*xstpol[0, 1, ...].squeeze()],
-    #        [PP*xstpol[1, 0, ...].squeeze(), PP*xstpol[1, 1, ...].squeeze()]])
-    xstpupol = PP*xstpol
+    phasefactors = numpy.exp(-2.0j*numpy.pi*UVWxyz[:,2]/lambda0
+                             ).astype(dtype, copy=False)
+    PP = numpy.multiply.outer(phasefactors, numpy.conj(phasefactors))
+    # PP broadcasts over the leading pol axes of xstpol
+    xstpupol = PP*xstpol.astype(dtype, copy=False)
     return xstpupol
 
 
@@ -14,18 +14,30 @@ These folders typically contain more than one datafile representing a dataset of
 the corresponding datatype.
 """
 import os
+import re
 import shutil
 import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy
 import yaml
 import argparse
 import warnings
+# Use libyaml based (C) YAML loader/dumper if available
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
 
 # Set ignore FutureWarning (for h5py)
 warnings.filterwarnings(action='ignore', category=FutureWarning) 
 import h5py
+try:
+    import hdf5plugin
+    canuse_hdf5plugin = True
+except ImportError:
+    canuse_hdf5plugin = False
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
 import matplotlib.dates as mdates
@@ -48,6 +60,42 @@ import ilisa.operations.modeparms as modeparms
 
 
 _RCU_SB_SEP = "+"
+# Compiled patterns of CVC (ACC & XST) data file names
+_ACC_FILE_RE = re.compile(r'(?P<Ymd>\d{8})_(?P<HMS>\d{6})_acc_?'
+                          r'(?P<nrsamps>\d+)x(?P<nrrcus0>\d+)'
+                          r'x(?P<nrrcus1>\d+)\.')
+_XST_FILE_RE = re.compile(r'(?P<Ymd>\d{8})_(?P<HMS>\d{6})_xst_?'
+                          r'spw(?P<spw>\d+)_sb(?P<sb>\d+)\.')
+# XST file names as recorded may have no spw & sb fields
+_XST_CVCFILE_RE = re.compile(r'(?P<Ymd>\d{8})_(?P<HMS>\d{6})_xst[^.]*\.')
+# Compiled patterns of BST & SST data file names
+_BST_FILE_RE = re.compile(r'(?P<Ymd>\d{8})_(?P<HMS>\d{6})_(?:[^.]*_)?'
+                          r'0*(?P<pol>[^_.]*)\.dat$')
+_SST_FILE_RE = re.compile(r'(?P<Ymd>\d{8})_(?P<HMS>\d{6})_[^_]*_'
+                          r'rcu(?P<rcu>\d+)\.dat$')
+# Data type of a time sample in an SST data file
+_SST_DTYPE = numpy.dtype(('f8', (512,)))
+# Compiled pattern of file-folder names (see obsinfo2filefolder())
+_FILEFOLDER_RE = re.compile(r'(?P<stnidantset>[^_]{5,})'
+                            r'_(?P<Ymd>\d{8})_(?P<HMS>\d{6})'
+                            r'_spw(?P<spw>[^_]*)'
+                            r'(?:_sb(?P<sb>[^_]*))?'
+                            r'(?:_int(?P<integration>[^_]*))?'
+                            r'_dur(?P<duration>[^_]*)'
+                            r'(?:_dir(?P<pointing>[^_]*))?'
+                            r'(?:_(?P<modality>(?:cal|mod)[^_]*))?'
+                            r'_(?P<ldat_type>[^_]+)$')
+
+
+def _parse_dt_compact(Ymd, HMS):
+    """\
+    Return datetime of compact date 'YYYYmmdd' and time 'HHMMSS' strings
+
+    Same as strptime(Ymd+'T'+HMS, '%Y%m%dT%H%M%S') but without the format
+    parsing overhead.
+    """
+    return datetime.datetime(int(Ymd[0:4]), int(Ymd[4:6]), int(Ymd[6:8]),
+                             int(HMS[0:2]), int(HMS[2:4]), int(HMS[4:6]))
 
 
 def datafolder_type(datafolderpath):
@@ -219,44 +267,42 @@ def obsinfo2filefolder(obsinfo):
         ldat_type = obsinfo['datatype']
     else:
         ldat_type = obsinfo.get('ldat_type')
-    filefoldername = obsinfo['station_id']
+    stnidantset = obsinfo['station_id']
     antennaset = obsinfo.get('antennaset')
     if antennaset:
-        antennaset = antennaset.replace('_', '-')
-        filefoldername += antennaset
-    filefoldername += '_' + obsinfo['filenametime']
+        stnidantset += antennaset.replace('_', '-')
+    parts = [stnidantset, obsinfo['filenametime']]
 
     spwstr = ''
     if obsinfo['spw']:
         spwstr = \
             ''.join([str(spw) for spw in obsinfo['spw']])
-    filefoldername += '_spw' + spwstr
+    parts.append('spw' + spwstr)
     if ldat_type != 'sst' and ldat_type != 'acc':
         if obsinfo['subbands'] != [] and obsinfo['subbands'] != '':
-            filefoldername += "_sb"
-            filefoldername += seqlists2slicestr(obsinfo['subbands'])
+            parts.append('sb' + seqlists2slicestr(obsinfo['subbands']))
     if 'integration' in obsinfo and obsinfo['integration']:
-        filefoldername += '_int' + str(obsinfo['integration'])
+        parts.append('int' + str(obsinfo['integration']))
     if 'duration_scan' in obsinfo:
-        filefoldername += '_dur' + str(int(obsinfo['duration_scan']))
+        parts.append('dur' + str(int(obsinfo['duration_scan'])))
     if ldat_type != 'sst':
         if str(obsinfo['pointing']) != '':
-            filefoldername += '_dir' + str(obsinfo['pointing'])
+            parts.append('dir' + str(obsinfo['pointing']))
         else:
-            filefoldername += '_dir,,'
+            parts.append('dir,,')
     cal = obsinfo.get('cal', None)
     if cal:
         if ldat_type == 'acc' or ldat_type == 'xst':
-            filefoldername += '_cal'
+            parts.append('cal')
         else:
             warnings.warn('Only ACC and XST can be calibrated.')
     else:
         model = obsinfo.get('model', None)
         if model:
-            filefoldername += '_mod'
-    # filefoldername += "_" + obsinfo['source']
+            parts.append('mod')
     # ldat_type extension
-    filefoldername += "_" + ldat_type
+    parts.append(ldat_type)
+    filefoldername = '_'.join(parts)
     return filefoldername
 
 
@@ -287,51 +333,40 @@ def filefolder2obsinfo(filefolderpath):
     # stnid?_Ymd_HMS_rcustr_intstr_durstr_sst
     # stnid?_Ymd_HMS_rcustr_sbstr_intstr_durstr_dirstr_xst
     # stnid_Ymd_HMS_rcustr_sbstr_durstr_dirstr_bfs
-    filefoldersplit = filefoldername.split('_')
-    # Take care of possible "cal*" or "mod" tag just before ldattype:
-    if filefoldersplit[-2].startswith('cal')\
-            or filefoldersplit[-2].startswith('mod'):
+    m = _FILEFOLDER_RE.match(filefoldername)
+    if not m:
+        raise ValueError("Not a LOFAR data file-folder name: '{}'"
+                         .format(filefoldername))
+    ffinfo = m.groupdict()
+    ldat_type = ffinfo['ldat_type']
+    if ffinfo['modality']:
         # Special modality for this ldat either
         # calibration has been applied
         # or this is a visibility model for the ldat.
-        modality = filefoldersplit.pop(-2)
-        obsinfo[modality] = True
-    ldat_type = filefoldersplit.pop()
-    if ldat_type == 'bfs':
-        # Does not have int<int> field so insert int 0:
-        filefoldersplit.insert(-2, 'int0')
-    if ldat_type != 'sst' and ldat_type != 'acc':
-        # Have a sb<str> field:
-        dirstr = filefoldersplit.pop()
-        sbstr = filefoldersplit.pop(-3)
-    else:
+        obsinfo[ffinfo['modality']] = True
+    if ldat_type == 'sst' or ldat_type == 'acc':
         # Do not have a sb<str> field:
-        if ldat_type != 'acc':
-            dirstr = ",,"
-        else:
-            dirstr = filefoldersplit.pop()
-        sbstr = 'sb0:511'
-    if len(filefoldersplit[0]) >= 5:
-        stnidantset = filefoldersplit.pop(0)
-        stnid = stnidantset[:5]
-        antennaset = stnidantset[5:].replace('-', '_')
-        obsinfo['antennaset'] = antennaset
-    else:
-        stnid = None
-    (Ymd, HMS, spwstr, intstr, durstr) = filefoldersplit[:]
+        ffinfo['sb'] = '0:511'
+    if ldat_type == 'sst':
+        ffinfo['pointing'] = ''
+    if ldat_type == 'bfs':
+        # Does not have int<int> field:
+        ffinfo['integration'] = '0'
+    stnidantset = ffinfo['stnidantset']
+    stnid = stnidantset[:5]
+    obsinfo['antennaset'] = stnidantset[5:].replace('-', '_')
 
     obsinfo['station_id'] = stnid
-    obsinfo['filenametime'] = Ymd + '_' + HMS
-    obsinfo['datetime'] = datetime.datetime.strptime(Ymd + 'T' + HMS,
-                                                     '%Y%m%dT%H%M%S')
-    obsinfo['spw'] = spwstr[3:]
+    obsinfo['filenametime'] = ffinfo['Ymd'] + '_' + ffinfo['HMS']
+    obsinfo['datetime'] = _parse_dt_compact(ffinfo['Ymd'], ffinfo['HMS'])
+    obsinfo['spw'] = ffinfo['spw']
     if obsinfo['antennaset'] == '':
         # Assume a sensible value for antennaset based on spw:
         obsinfo['antennaset'] = modeparms.rcumode2antset_eu(obsinfo['spw'])[:3]
-    obsinfo['subbands'] = sbstr[2:]  # slicestr2seqlists(sbstr[2:])
-    obsinfo['integration'] = float(intstr[3:])
-    obsinfo['duration_scan'] = int(durstr[3:])
-    obsinfo['pointing'] = dirstr[3:]
+    obsinfo['subbands'] = ffinfo['sb']
+    obsinfo['integration'] = float(ffinfo['integration'])
+    obsinfo['duration_scan'] = int(ffinfo['duration'])
+    obsinfo['pointing'] = ffinfo['pointing'] or ''
     obsinfo['ldat_type'] = ldat_type
 
     if len(obsinfo['spw']) > 1:
@@ -342,20 +377,15 @@ def filefolder2obsinfo(filefolderpath):
         obsinfo['spw'] = [obsinfo['spw']]
     if type(obsinfo['subbands']) is not list:
         obsinfo['subbands'] = [obsinfo['subbands']]
-    obsinfo['frequencies'] = numpy.empty(0)
+    freq_chunks = []
     beamlets = []
     totnrsbs = 0
     for spw_nr, spw in enumerate(obsinfo['spw']):
         sblist = modeparms.seqarg2list(obsinfo['subbands'][spw_nr])
         nrsbs = len(sblist)
-        sblo = sblist[0]
         sbhi = sblist[-1]
         nz = modeparms.rcumode2nyquistzone(spw)
-        freqlo = modeparms.sb2freq(sblo, nz)
-        freqhi = modeparms.sb2freq(sbhi, nz)
-        obsinfo['frequencies'] = numpy.append(obsinfo['frequencies'],
-                                              numpy.linspace(freqlo, freqhi,
-                                                             nrsbs))
+        freq_chunks.append(modeparms.sbs2freqs(sblist, nz))
         bmltarg = seqlists2slicestr(
             ','.join([str(_b) for _b in range(nrsbs)]))
         beamlets.append(bmltarg)
@@ -378,15 +408,12 @@ def filefolder2obsinfo(filefolderpath):
         missing_nr_sbs = maxnrbls - totnrsbs
 
         if missing_nr_sbs > 0:
-            nrsbs = missing_nr_sbs
             sblo = sbhi + 1
-            sbhi = sblo + nrsbs - 1
-            freqlo = modeparms.sb2freq(sblo, nz)
-            freqhi = modeparms.sb2freq(sbhi, nz)
-            obsinfo['frequencies'] = numpy.append(obsinfo['frequencies'],
-                                                  numpy.linspace(freqlo, freqhi,
-                                                                 nrsbs))
+            freq_chunks.append(modeparms.sbs2freqs(
+                numpy.arange(sblo, sblo + missing_nr_sbs), nz))
         obsinfo['max_nr_bls'] = maxnrbls
+    obsinfo['frequencies'] = (numpy.concatenate(freq_chunks) if freq_chunks
+                              else numpy.empty(0))
 
     # Assemble _cmds
     #    rcusetup_cmds
@@ -435,18 +462,19 @@ def filename2obsparm(filepath):
         cvcdim2
     """
     filename = os.path.basename(filepath)
-    (Ymd, HMS, cvcextrest) = filename.split('_', 2)
-    datatype, restdat = cvcextrest[:3], cvcextrest[3:]
-    (rest, _datstr) = restdat.split('.')
-    rest = rest.lstrip('_')
-    if datatype == 'acc':
-        (_nrsamps, nrrcus0, nrrcus1) = map(int, rest.split('x'))
-    elif datatype == 'xst':
-        spwnr, sbnr = rest.split('_')
-        spw = int(spwnr[3:])
-        sb = str(int(sbnr[2:]))
-    filenamedatetime = datetime.datetime.strptime(Ymd + 'T' + HMS,
-                                                  '%Y%m%dT%H%M%S')
+    spw, sb = None, None
+    m = _ACC_FILE_RE.match(filename)
+    if m:
+        datatype = 'acc'
+        _nrsamps = int(m.group('nrsamps'))
+    else:
+        m = _XST_FILE_RE.match(filename)
+        if not m:
+            raise ValueError("Not a CVC data file name: '{}'".format(filename))
+        datatype = 'xst'
+        spw = int(m.group('spw'))
+        sb = str(int(m.group('sb')))
+    filenamedatetime = _parse_dt_compact(m.group('Ymd'), m.group('HMS'))
     # NOTE: For ACC, filename is last obstime, while for XST, it is first.
     if datatype == 'acc':
         filebegindatetime = filenamedatetime - datetime.timedelta(
@@ -530,11 +558,14 @@ class ScanRecInfo(object):
         self.gs_model = ''
         self.mockdata = mockdata
         self.comments = ''
+        # Cache of rcumode per filenr (cleared when scanrec info changes)
+        self._rcumode_cache = {}
 
     def add_obs(self, ldatinfo):
         """Add an LDatInfo object to this ScanRecInfo."""
         obs_id = ldatinfo.filenametime
         self.ldatinfos[obs_id] = ldatinfo
+        self._rcumode_cache.clear()
 
     def get_obs_ids(self):
         """
@@ -547,9 +578,10 @@ class ScanRecInfo(object):
 
     def list_ldatfiles(self):
         # Select only data files in folder (avoid CalTable*.dat files)
-        ls = os.listdir(self.scanrecpath)
-        filenames = [filename for filename in ls if filename.endswith('.dat')
-                     and not filename.startswith('CalTable')]
+        with os.scandir(self.scanrecpath) as ls:
+            filenames = [e.name for e in ls if e.name.endswith('.dat')
+                         and not e.name.startswith('CalTable')
+                         and e.is_file()]
         filenames.sort()  # This enforces chronological order
         return filenames
 
@@ -557,16 +589,11 @@ class ScanRecInfo(object):
         self.stnid = stnid
 
     def get_stnid(self):
-        try:
-            stnid = self.stnid
-        except:
-            try:
-                stnid = self.ldatinfos[0].stnid
-            except:
-                try:
-                    stnid = self.scanrecparms['station']
-                except:
-                    raise RuntimeError('Station id not found.')
+        stnid = getattr(self, 'stnid', None)
+        if stnid is None and self.scanrecparms:
+            stnid = self.scanrecparms.get('station')
+        if stnid is None:
+            raise RuntimeError('Station id not found.')
         return stnid
 
     def set_scanrecparms(self, ldat_type, freqspec, duration,
@@ -597,29 +624,31 @@ class ScanRecInfo(object):
         self.scanrecparms['integration'] = integration
         if antset:
             self.scanrecparms['antennaset'] = antset
+        self._rcumode_cache.clear()
 
     def set_caltabinfos(self, caltabinfos):
         self.caltabinfos = caltabinfos
 
     def write_scanrec(self, datapath):
+        contents = {'headerversion': self.headerversion,
+                    'station': self.stnid,
+                    'scanrecparms': self.scanrecparms}
+        if self.sourcename:
+            contents['sourcename'] = self.sourcename
+        contents['ldat_ids'] = list(self.ldatinfos.keys())
+        # Data modalities:
+        if self.caltabinfos != []:
+            contents['caltabinfos'] = self.caltabinfos
+        if self.gs_model:
+            contents['gs_model'] = self.gs_model
+        if self.mockdata:
+            contents['mockdata'] = True
         with open(os.path.join(datapath, self.scanrecinfo_header), "w") as f:
-            f.write("# Scan recording header\n")
-            f.write("# Created by {} version {}\n".format("iLiSA",
-                                                          ilisa.__version__))
-            f.write("headerversion: {}\n".format(self.headerversion))
-            f.write("station: {}\n".format(self.stnid))
-            f.write("scanrecparms: {!r}\n".format(self.scanrecparms)
-                    .replace('None', 'null'))
-            if self.sourcename:
-                f.write("sourcename: {}\n".format(self.sourcename))
-            f.write("ldat_ids: {!r}\n".format(list(self.ldatinfos.keys())))
-            # Data modalities:
-            if self.caltabinfos != []:
-                f.write("caltabinfos: {}\n".format(self.caltabinfos))
-            if self.gs_model:
-                f.write("gs_model: {}\n".format(self.gs_model))
-            if self.mockdata:
-                f.write("mockdata: true\n")
+            f.write("# Scan recording header\n"
+                    "# Created by {} version {}\n".format("iLiSA",
+                                                         ilisa.__version__))
+            yaml.dump(contents, f, Dumper=_YamlDumper, sort_keys=False,
+                      default_flow_style=None, width=1000)
 
     def read_scanrec(self, datapath):
         """
@@ -633,7 +662,7 @@ class ScanRecInfo(object):
         try:
             _h_path = os.path.join(datapath, self.scanrecinfo_header)
             with open(_h_path, 'r') as hf:
-                scanrecfiledict = yaml.safe_load(hf)
+                scanrecfiledict = yaml.load(hf, Loader=_YamlLoader)
         except Exception:
             warnings.warn(
                 "Couldn't find Scanrecinfo file. Will try filefolder name...")
@@ -649,6 +678,7 @@ class ScanRecInfo(object):
         self.gs_model = scanrecfiledict.get('gs_model', '')
         self.mockdata = scanrecfiledict.get('mockdata', False)
         self.comments = scanrecfiledict.get('comments', '')
+        self._rcumode_cache.clear()
         return self
 
     def read_scanrec_from_ff(self, datapath):
@@ -675,6 +705,7 @@ class ScanRecInfo(object):
                                   obsinfo['duration_scan'], obsinfo['pointing'],
                                   obsinfo['integration'], obsinfo['antennaset'])
             self.scanrecparms['rcumode'] = spw
+            self._rcumode_cache.clear()
             self.set_stnid(obsinfo['station_id'])
             self.calibrationfile = None
             print("Read in filefolder meta.")
@@ -714,6 +745,8 @@ class ScanRecInfo(object):
         return self.scanrecparms['datatype']
 
     def get_rcumode(self, filenr=0):
+        if filenr in self._rcumode_cache:
+            return self._rcumode_cache[filenr]
         try:
             rcumode = modeparms.FreqSetup(self.scanrecparms['freqspec'])._rcumodes[0]
         except:
@@ -721,7 +754,8 @@ class ScanRecInfo(object):
                 rcumode = self.ldatinfos[filenr].beamctl_cmd['rcumode']
             except:
                 rcumode = self.scanrecparms['rcumode']
-        return str(rcumode)
+        self._rcumode_cache[filenr] = str(rcumode)
+        return self._rcumode_cache[filenr]
 
     def get_band(self):
         return modeparms.rcumode2band(self.get_rcumode())
@@ -747,18 +781,9 @@ class ScanRecInfo(object):
 
     def is_septon(self, filenr=0):
         obs_ids = self.get_obs_ids()
-        try:
-            self.ldatinfos[obs_ids[filenr]]
-        except:
-            if self.get_datatype().endswith('SEPTON'):
-                return True
-            else:
-                return False
-        else:
-            if self.ldatinfos[obs_ids[filenr]].septonconf:
-                return True
-            else:
-                return False
+        if obs_ids and filenr < len(obs_ids):
+            return bool(self.ldatinfos[obs_ids[filenr]].septonconf)
+        return self.get_datatype().endswith('SEPTON')
 
     def get_septon_elmap(self, filenr=0):
         obs_ids = self.get_obs_ids()
@@ -844,18 +869,22 @@ class LDatInfo(object):
                 self.rcumode = self.mode
                 self.antset = modeparms.rcumode2antset_eu(self.mode)
 
-        # rspctl_cmds attr
-        if not rspctl_cmds:
-            rspctl_cmds = ['rspctl']
-        self.rspctl_cmds = rspctl_cmds
-        rspctl_args = modeparms.parse_rspctl_args(self.rspctl_cmds)
-        
         # septonconf attr
         self.septonconf = septonconf
         if self.septonconf is not None:
             self.rcumode = [5]
             self.antset = 'HBA'
-        
+
+        self._set_rspctl_attrs(rspctl_cmds)
+
+    def _set_rspctl_attrs(self, rspctl_cmds):
+        """Set attributes that depend on rspctl_cmds."""
+        # rspctl_cmds attr
+        if not rspctl_cmds:
+            rspctl_cmds = ['rspctl']
+        self.rspctl_cmds = rspctl_cmds
+        rspctl_args = modeparms.parse_rspctl_args(self.rspctl_cmds)
+
         # attrs: integration, duration_scan
         if self.ldat_type != 'bfs':
             if self.ldat_type != 'acc':
@@ -873,6 +902,18 @@ class LDatInfo(object):
         elif self.ldat_type == 'bst':
             self.sb = self.sb
 
+    def new_rspctl(self, rspctl_cmds):
+        """\
+        Copy this LDatInfo but with other rspctl_cmds
+
+        Avoids reparsing the rcusetup and beamctl cmds, which are the same
+        for all the subscans of a scan.
+        """
+        ldatinfo = self.__class__.__new__(self.__class__)
+        ldatinfo.__dict__.update(self.__dict__)
+        ldatinfo.filenametime = None
+        ldatinfo._set_rspctl_attrs(rspctl_cmds)
+        return ldatinfo
 
     def write_ldat_header(self, datapath):
         """Create a header file for LOFAR standalone observation."""
@@ -894,9 +935,10 @@ class LDatInfo(object):
         ldat_header_filename = (self.filenametime + '_' + self.ldat_type
                                 + xtra + '.h')
         with open(os.path.join(datapath, ldat_header_filename), 'w') as f:
-            f.write('# LCU obs settings, header file\n')
-            f.write('# Header version'+' '+self.headerversion+'\n')
-            yaml.dump(contents, f, default_flow_style=False, width=1000)
+            f.write('# LCU obs settings, header file\n'
+                    + '# Header version' + ' ' + self.headerversion + '\n')
+            yaml.dump(contents, f, Dumper=_YamlDumper,
+                      default_flow_style=False, width=1000)
 
     def get_recfreq(self, sampnr=0):
         """Return data recording frequency in Hz
@@ -924,8 +966,8 @@ class LDatInfo(object):
 
     def get_starttime(self):
         """Return the datetime when this obs started."""
-        filetime = datetime.datetime.strptime(self.filenametime,
-                                              "%Y%m%d_%H%M%S")
+        filetime = _parse_dt_compact(
+            *self.filenametime.split('_'))
         if self.ldat_type != 'acc':
             starttime = filetime
         else:
@@ -1020,75 +1062,99 @@ class LDatInfo(object):
         """Parse a ldat header file and return it as an LDatInfo."""
         # TODO extract CalTable info.
         if os.path.isdir(headerpath):
-            files = os.listdir(headerpath)
-            headerfiles = [f for f in files if f.endswith('.h')]
+            with os.scandir(headerpath) as files:
+                headerfiles = [e.name for e in files
+                               if e.name.endswith('.h') and e.is_file()]
             headerfile = os.path.join(headerpath, headerfiles.pop())
         else:
             headerfile = headerpath
         stnid = None
         starttime = None
         headerversion = 0
+        # Header files are small so read it in once
         with open(headerfile, 'r') as hf:
-            for hline in hf:
-                if "Header version" in hline:
-                    headerversion = hline.split()[-1]
+            hraw = hf.read()
+        hlines = hraw.splitlines(True)
+        for hline in hlines:
+            if "Header version" in hline:
+                headerversion = hline.split()[-1]
+                break
         beamctl_line = ""
         contents = {}
         datatype = None
-        with open(headerfile, 'r') as hf:
-            if headerversion == '1':
-                rspctl_lines = []
-                for line in hf:
-                    if "Observer" in line:
-                        _label, _observer = line.split('=')
-                    if "Project" in line:
-                        _label, _project = line.split('=')
-                    if "DataType" in line:
-                        _label, datatype = line.split('=')
-                    if "StationID" in line:
-                        _label, stnid = line.split('=')
-                        stnid = stnid.strip()
-                    if "StartTime" in line:
-                        _label, starttime = line.split('=')
-                        starttime = starttime.strip()
-                    if "beamctl" in line:
-                        # HACK
-                        beamctl_line = line
-                    if "rspctl" in line:
-                        rspctl_lines.append(line)
-            elif headerversion == '2':
-                contents = yaml.safe_load(hf)
-                _observer = contents['Observer']
-                _project = contents['Project']
-                datatype = contents['DataType']
-                stnid = contents['StationID']
-                starttime = contents['StartTime']
-                beamctl_line = contents['BeamctlCmds']
-                rspctl_lines = contents['RspctlCmds'].split('\n')
+        if headerversion == '1':
+            rspctl_lines = []
+            for line in hlines:
+                if "Observer" in line:
+                    _label, _observer = line.split('=')
+                if "Project" in line:
+                    _label, _project = line.split('=')
+                if "DataType" in line:
+                    _label, datatype = line.split('=')
+                if "StationID" in line:
+                    _label, stnid = line.split('=')
+                    stnid = stnid.strip()
+                if "StartTime" in line:
+                    _label, starttime = line.split('=')
+                    starttime = starttime.strip()
+                if "beamctl" in line:
+                    # HACK
+                    beamctl_line = line
+                if "rspctl" in line:
+                    rspctl_lines.append(line)
+        elif headerversion == '2':
+            contents = yaml.load(hraw, Loader=_YamlLoader)
+            if not isinstance(contents, dict):
+                raise ValueError("Header file {} has no header contents"
+                                 .format(headerfile))
+            _observer = contents['Observer']
+            _project = contents['Project']
+            datatype = contents['DataType']
+            stnid = contents['StationID']
+            starttime = contents['StartTime']
+            beamctl_line = contents['BeamctlCmds']
+            rspctl_lines = contents['RspctlCmds'].split('\n')
+        else:
+            # headerversion == '4':
+            contents = yaml.load(hraw, Loader=_YamlLoader)
+            if not isinstance(contents, dict):
+                raise ValueError("Header file {} has no header contents"
+                                 .format(headerfile))
+            datatype = contents['ldat_type']
+            filenametime = contents['filenametime']
+            # stnid = contents['station_id']
+            rcusetup_cmds = contents['rcusetup_cmds']
+            beamctl_cmds = contents['beamctl_cmds']
+            rspctl_cmds = contents['rspctl_cmds']
+            if 'caltabinfos' in contents:
+                caltabinfos = contents['caltabinfos']
             else:
-                # headerversion == '4':
-                contents = yaml.safe_load(hf)
-                datatype = contents['ldat_type']
-                filenametime = contents['filenametime']
-                # stnid = contents['station_id']
-                rcusetup_cmds = contents['rcusetup_cmds']
-                beamctl_cmds = contents['beamctl_cmds']
-                rspctl_cmds = contents['rspctl_cmds']
-                if 'caltabinfos' in contents:
-                    caltabinfos = contents['caltabinfos']
-                else:
-                    caltabinfos = []
-                if 'septonconf' in contents:
-                    septonconf = contents['septonconf']
-                else:
-                    septonconf = None
+                caltabinfos = []
+            if 'septonconf' in contents:
+                septonconf = contents['septonconf']
+            else:
+                septonconf = None
         ldatinfo = cls(datatype, rcusetup_cmds, beamctl_cmds, rspctl_cmds,
                        caltabinfos=caltabinfos, septonconf=septonconf)
         ldatinfo.filenametime = filenametime
         return ldatinfo
 
 
-def readbstfolder(bst_filefolder):
+def _memmap_samples(filepath, dtype):
+    """\
+    Memory-map (read-only) the whole samples in a data file
+
+    A partial sample at the end of the file (e.g. from a live or interrupted
+    recording) is left out, and an empty file gives an empty array, since
+    numpy.memmap cannot map either.
+    """
+    nrsamps = os.path.getsize(filepath) // dtype.itemsize
+    if nrsamps == 0:
+        return numpy.empty(0, dtype=dtype)
+    return numpy.memmap(filepath, dtype=dtype, mode='r', shape=(nrsamps,))
+
+
+def readbstfolder(bst_filefolder, memmap=False):
     """\
     Read a BST file-folder and return data
 
@@ -1096,6 +1162,9 @@ def readbstfolder(bst_filefolder):
     ----------
     bst_filefolder : str
         Path to BST file-folder.
+    memmap : bool
+        Memory-map (read-only) the data files rather than reading them into
+        memory, so data is only paged in when accessed.
 
     Returns
     -------
@@ -1116,8 +1185,9 @@ def readbstfolder(bst_filefolder):
     maxnrsbs = obsinfo['max_nr_bls']
     intg = obsinfo['integration']
     freqs = obsinfo['frequencies']
-    bst_dirls = os.listdir(bst_filefolder)
-    bst_files = sorted([f for f in bst_dirls if f.endswith('.dat')])
+    with os.scandir(bst_filefolder) as bst_dirls:
+        bst_files = sorted([e.name for e in bst_dirls
+                            if e.name.endswith('.dat') and e.is_file()])
 
     # Now read the BST pol data
     bst_dtype = numpy.dtype(('f8', (maxnrsbs,)))
@@ -1126,18 +1196,26 @@ def readbstfolder(bst_filefolder):
     ts = []
 
     for bst_polfile in bst_files:
-        pol = bst_polfile.rstrip('.dat').split('_')[-1].lstrip('0')
-        with open(os.path.join(bst_filefolder, bst_polfile), 'rb') as fin:
-            if pol != 'XY':
-                _bst_dtype = bst_dtype
-            else:
-                _bst_dtype = bstc_dtype
-            filedata = numpy.fromfile(fin, dtype=_bst_dtype)
+        bstfile_m = _BST_FILE_RE.match(bst_polfile)
+        if not bstfile_m:
+            raise ValueError("File name {} not in bst format."
+                             .format(bst_polfile))
+        pol = bstfile_m.group('pol')
+        if pol != 'XY':
+            _bst_dtype = bst_dtype
+        else:
+            _bst_dtype = bstc_dtype
+        bst_polpath = os.path.join(bst_filefolder, bst_polfile)
+        if memmap:
+            filedata = _memmap_samples(bst_polpath, _bst_dtype)
+        else:
+            filedata = numpy.fromfile(
+                bst_polpath, dtype=_bst_dtype,
+                count=os.path.getsize(bst_polpath) // _bst_dtype.itemsize)
         if pol == 'X' or pol == 'XX':
             bst_data_xx.append(filedata)
-            Ymd, HMS, _ = bst_polfile.split('_', 2)
-            file_start_dt = datetime.datetime.strptime(Ymd + '_' + HMS,
-                                                       '%Y%m%d_%H%M%S')
+            file_start_dt = _parse_dt_compact(
+                bstfile_m.group('Ymd'), bstfile_m.group('HMS'))
             file_dur = filedata.shape[0]*intg
             ts_rel = numpy.arange(0., file_dur, intg)
             file_ts =\
@@ -1153,19 +1231,56 @@ def readbstfolder(bst_filefolder):
     return bst_data_xx, bst_data_yy, bst_data_xy, ts, freqs, obsinfo
 
 
-def readsstfolder(sstfolder):
+class SSTLazyFolder(object):
+    """\
+    SST data files of a folder, memory-mapped on demand per RCU
+
+    Indexing with an RCU number memory-maps (read-only) the files of that RCU
+    on first access, and returns the list of memmaps, one for each file.
+    """
+    def __init__(self, sstfolder, rcufiles):
+        self.sstfolder = sstfolder
+        self._rcufiles = rcufiles
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._rcufiles)
+
+    def __getitem__(self, rcu):
+        if rcu not in self._cache:
+            self._cache[rcu] = [
+                _memmap_samples(os.path.join(self.sstfolder, sstfile),
+                                _SST_DTYPE)
+                for sstfile in self._rcufiles[rcu]]
+        return self._cache[rcu]
+
+
+def readsstfolder(sstfolder, memmap=False, lazy=False):
     """Read-in SST datafile.
 
     Parameters
     ----------
     sstfolder : str
         The name of the folder which contains an SST datafile for each RCU.
+    memmap : bool
+        Memory-map (read-only) the data files rather than reading them into
+        memory. Useful when data does not fit into memory (e.g. 24h @ 1s),
+        but each map keeps a file open so one may need to raise the limit on
+        open files (bash> ulimit -n <N>).
+    lazy : bool
+        Do not read any data, but return an SSTLazyFolder that memory-maps
+        the files of an RCU only when it is indexed.
 
     Returns
     -------
     sstdata_rcu : (192, N, S, 512)
         The SST data, where N is number of files per RCU
         and S is the number of time samples with a file.
+        It is one contiguous array, or if memmap, a list over RCUs of lists
+        of file memmaps, or if lazy, an SSTLazyFolder. If the RCUs do not
+        all have the same number of files or the files differ in length
+        (e.g. an interrupted recording), it is a list over RCUs of lists of
+        file arrays, each with the file's own number of samples.
     ts : (N, S)
         The datetimes over files and samples.
     freqs : (F)
@@ -1176,41 +1291,70 @@ def readsstfolder(sstfolder):
     obsinfo = filefolder2obsinfo(sstfolder)
     intg = obsinfo['integration']
     freqs = obsinfo['frequencies']
-    files = os.listdir(sstfolder)
-    sstfiles = [f for f in files if f.endswith('.dat')]
-    sstfiles.sort()
+    with os.scandir(sstfolder) as files:
+        sstfiles = sorted([e.name for e in files
+                           if e.name.endswith('.dat') and e.is_file()])
     ts = []
-    # For each RCU initialize a list for each (rcu) file SST data
-    sstdata_rcu = [[] for _ in range(192)]
+    sst_dtype = _SST_DTYPE
+    sstfileinfos = []
+    rcufiles = [[] for _rcu in range(192)]
     for sstfile in sstfiles:
-        # Read sst file
-        sst_filepath = os.path.join(sstfolder, sstfile)
-        try:
-            (Ymd, HMS, _sststr, rcudatstr) = sstfile.split('_')
-            file_start_dattim = datetime.datetime.strptime(Ymd + 'T' + HMS,
-                                                           '%Y%m%dT%H%M%S')
-            (rcu, _datext) = rcudatstr[3:].split('.')
-            rcu = int(rcu)
-        except:
+        sstfile_m = _SST_FILE_RE.match(sstfile)
+        if not sstfile_m:
             raise ValueError("File name {} not in sst format.".format(sstfile))
-        # Now read the SST data
-        sst_dtype = numpy.dtype(('f8', (512,)))
-
-        # Normally just read all data into memory...
-        sstfiledata = numpy.fromfile(sst_filepath, dtype=sst_dtype)
-        # ...but in case data does not fit into memory (24h @ 1s) use memmap:
-        # #sstfiledata = numpy.memmap(sst_filepath, dtype=sst_dtype, mode='r')
-        # Note that using memmap can cause a linux error for too many open files
-        # in which case use bash> ulimit -n <N>  where <N> is no. files
-
-        # Append file data array for this rcu to full data array
-        sstdata_rcu[rcu].append(sstfiledata)
-        del sstfiledata
-        # Assume time of samples is same for all RCU files;
-        # deal only with 1st one
+        file_start_dattim = _parse_dt_compact(
+            sstfile_m.group('Ymd'), sstfile_m.group('HMS'))
+        rcu = int(sstfile_m.group('rcu'))
+        # File nr of this rcu (files are sorted chronologically)
+        filenr = len(rcufiles[rcu])
+        rcufiles[rcu].append(sstfile)
+        file_nrsmps = (os.path.getsize(os.path.join(sstfolder, sstfile))
+                       // sst_dtype.itemsize)
+        sstfileinfos.append((sstfile, rcu, filenr, file_start_dattim,
+                             file_nrsmps))
+    nrfiles_rcu = [len(_files) for _files in rcufiles]
+    # Contiguous array only if all RCUs have same nr of equally long files
+    is_regular = (len(set(nrfiles_rcu)) == 1
+                  and len(set(info[-1] for info in sstfileinfos)) <= 1)
+    if lazy:
+        sstdata_rcu = SSTLazyFolder(sstfolder, rcufiles)
+    elif memmap or not is_regular:
+        # For each RCU a list of arrays (or memmaps), one for each (rcu) file
+        sstdata_rcu = [[None]*nrfiles for nrfiles in nrfiles_rcu]
+    else:
+        # Preallocate one contiguous array over rcu, file, sample & subband
+        file_nrsmps = sstfileinfos[0][-1] if sstfileinfos else 0
+        sstdata_rcu = numpy.empty((192, nrfiles_rcu[0], file_nrsmps, 512))
+
+    def _readsstfile(sstfileinfo):
+        sstfile, rcu, filenr, _, file_nrsmps = sstfileinfo
+        sst_filepath = os.path.join(sstfolder, sstfile)
+        if memmap:
+            sstdata_rcu[rcu][filenr] = _memmap_samples(sst_filepath,
+                                                       sst_dtype)
+            return
+        if is_regular:
+            sstfiledata = sstdata_rcu[rcu, filenr]
+        else:
+            sstfiledata = numpy.empty(file_nrsmps, dtype=sst_dtype)
+            sstdata_rcu[rcu][filenr] = sstfiledata
+        with open(sst_filepath, 'rb') as fin:
+            # Any partial sample at end of file is ignored (like fromfile)
+            nrbytes = fin.readinto(sstfiledata)
+            if nrbytes != sstfiledata.nbytes:
+                raise ValueError("SST file {} does not have {} samples."
+                                 .format(sstfile, file_nrsmps))
+
+    if not lazy:
+        # Read the SST files concurrently (they are independent I/O streams)
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(sstfiles)))
+                                ) as executor:
+            # Consume results so that exceptions in workers are raised here
+            list(executor.map(_readsstfile, sstfileinfos))
+    # Assume time of samples is same for all RCU files; deal only with 1st one
+    for _sstfile, rcu, _filenr, file_start_dattim, file_nrsmps \
+            in sstfileinfos:
         if rcu == 0:
-            Ymd, HMS, _ = sstfile.split('_', 2)
-            file_nrsmps = sstdata_rcu[0][0].shape[0]
             file_dur = intg * file_nrsmps
             ts_rel = numpy.arange(0., file_dur, intg)
             file_ts = [file_start_dattim + datetime.timedelta(seconds=t)
@@ -1231,14 +1375,28 @@ class CVCfiles(object):
     ----------
     samptimeset: list of datetimes
         The datetime of the visibility matrix sample.
-    freqset: list of floats
-        The frequencies of the subbands used.
+    samptimeset_dt64: list of datetime64[us] arrays
+        Same as samptimeset but as one numpy array per file.
+    freqset: list of float arrays
+        The frequencies of the subbands used, one array per file.
+    memmap: bool
+        If True, items are memory-mapped (read-only) from the files rather
+        than read into memory, so only the samples accessed are paged in.
+    prefetch: bool
+        If True, getting item filenr also starts reading file filenr+1 in a
+        background thread, so sequential access overlaps file reads with
+        processing. Costs memory for one more file.
     """
     NRRCUS_EU = 192  # Default number of RCUs on EU stations
 
-    def __init__(self, datapath):
+    def __init__(self, datapath, memmap=False, prefetch=False):
         self._getitem_prev_file_nr_data_ = (None, None)
+        self.memmap = memmap
+        self.prefetch = prefetch
+        self._prefetch_executor = None
+        self._prefetched = (None, None)  # (filenr, future of _readcvcfile)
         self.samptimeset = []
+        self.samptimeset_dt64 = []
         self.freqset = []
 
         self.cvcdim1 = self.NRRCUS_EU
@@ -1264,8 +1422,6 @@ class CVCfiles(object):
 
         # Initialize
         scanrecinfo = ScanRecInfo()
-        samptimeset = []
-        freqset = []
         scanrecinfo.scanrecpath = self.filefolder
         scanrecinfo.read_scanrec(self.filefolder)
         stnid = scanrecinfo.get_stnid()
@@ -1273,17 +1429,48 @@ class CVCfiles(object):
         self.cvcdim1 = nrrcus
         self.cvcdim2 = nrrcus
         filenames = scanrecinfo.list_ldatfiles()
-        # Scan filefolder for ldat file and process
-        for cvcfile in filenames:
-            cvcdim_t = (os.path.getsize(os.path.join(self.filefolder, cvcfile))
-                        // self.__get_cvc_dtype().itemsize)
+        # Number of files is known, so preallocate the per-file lists
+        samptimeset = [None] * len(filenames)
+        samptimeset_dt64 = [None] * len(filenames)
+        freqset = [None] * len(filenames)
+        # List the header files once, rather than trying to open one per file
+        with os.scandir(self.filefolder) as ls:
+            hfilenames = {e.name for e in ls if e.name.endswith('.h')}
+        cvc_itemsize = self.__get_cvc_dtype().itemsize
+        # Integration & frequency setup are the same for all files
+        acc_freqs = None
+        if filenames:
+            integration = scanrecinfo.get_integration()
+            nz = modeparms.rcumode2nyquistzone(scanrecinfo.get_rcumode())
+            if scanrecinfo.get_datatype() == 'acc':
+                acc_freqs = modeparms.rcumode2sbfreqs(
+                    scanrecinfo.get_rcumode())
+
+        def _read_header(cvcfile):
+            """Return ldatinfo of cvcfile or, if header unusable, reason"""
             hfilename = LDatInfo.headerfromdatfile(cvcfile)
-            hfilepath = os.path.join(self.filefolder, hfilename)
+            if hfilename not in hfilenames:
+                return None, "Couldn't find a header file"
             try:
-                ldatinfo = LDatInfo.read_ldat_header(hfilepath)
-            except:
-                warnings.warn(
-                    "Couldn't find a header file for {}".format(cvcfile))
+                return LDatInfo.read_ldat_header(
+                    os.path.join(self.filefolder, hfilename)), None
+            except (OSError, ValueError, KeyError, IndexError,
+                    yaml.YAMLError) as e:
+                return None, "Couldn't parse header file {} ({!r})".format(
+                    hfilename, e)
+
+        # Read the (small, independent) header files concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(filenames)))
+                                ) as executor:
+            ldatinfos = list(executor.map(_read_header, filenames))
+        # Scan filefolder for ldat file and process
+        for filenr, (cvcfile, (ldatinfo, header_err)) in enumerate(
+                zip(filenames, ldatinfos)):
+            cvcdim_t = (os.path.getsize(os.path.join(self.filefolder, cvcfile))
+                        // cvc_itemsize)
+            if ldatinfo is None:
+                warnings.warn("{} for {}; using its file name instead."
+                              .format(header_err, cvcfile))
                 ldatinfo = LDatInfo.from_filename(cvcfile,
                                                   duration_scan=
                                                   scanrecinfo.scanrecparms[
@@ -1293,27 +1480,24 @@ class CVCfiles(object):
                 os.path.join(self.filefolder, cvcfile))
 
             # Compute time of each autocovariance matrix sample per subband
-            integration = scanrecinfo.get_integration()
-            obscvm_datetimes = [None] * cvcdim_t
-            for t_idx in range(cvcdim_t):
-                t_delta = datetime.timedelta(
-                    seconds=t_idx * integration
-                )
-                obscvm_datetimes[t_idx] = t_begin + t_delta
-            samptimeset.append(obscvm_datetimes)
+            # (vectorized, rounded to microseconds like timedelta)
+            t_deltas_us = numpy.rint(numpy.arange(cvcdim_t) * integration
+                                     * 1e6).astype('timedelta64[us]')
+            samptimeset_dt64[filenr] = (numpy.datetime64(t_begin, 'us')
+                                        + t_deltas_us)
+            samptimeset[filenr] = samptimeset_dt64[filenr].tolist()
 
             # Compute frequency of corresponding time sample
-            rcumode = scanrecinfo.get_rcumode()
-            nz = modeparms.rcumode2nyquistzone(rcumode)
-            if scanrecinfo.get_datatype() == 'acc':
-                freqs = modeparms.rcumode2sbfreqs(rcumode)
+            if acc_freqs is not None:
+                freqs = acc_freqs
             else:
                 sb = ldatinfo.sb
                 freq = modeparms.sb2freq(sb, nz)
-                freqs = [freq] * cvcdim_t
-            freqset.append(freqs)
+                freqs = numpy.full(cvcdim_t, freq)
+            freqset[filenr] = freqs
         (self.scanrecinfo, self.filenames, self.samptimeset, self.freqset
          ) = scanrecinfo, filenames, samptimeset, freqset
+        self.samptimeset_dt64 = samptimeset_dt64
         # Get/Compute ant positions
         antset = self.scanrecinfo.get_antset()
         self.stn_pos, self.stn_rot, self.stn_antpos, self.stn_intilepos \
@@ -1335,14 +1519,29 @@ class CVCfiles(object):
         if filenr == prev_filenr:
             datafromfile = prev_datafromfile
         else:
-            cvcfile = self.filenames[filenr]
-            cvcpath = os.path.join(self.filefolder, cvcfile)
-            datafromfile, _t_begin = self._readcvcfile(cvcpath)
+            prefetched_filenr, prefetched_read = self._prefetched
+            self._prefetched = (None, None)
+            if filenr == prefetched_filenr:
+                datafromfile, _t_begin = prefetched_read.result()
+            else:
+                cvcfile = self.filenames[filenr]
+                cvcpath = os.path.join(self.filefolder, cvcfile)
+                datafromfile, _t_begin = self._readcvcfile(cvcpath)
             self._getitem_prev_file_nr_data_ = (filenr, datafromfile)
+            if self.prefetch and 0 <= filenr < len(self.filenames) - 1:
+                if self._prefetch_executor is None:
+                    self._prefetch_executor = ThreadPoolExecutor(max_workers=1)
+                nextpath = os.path.join(self.filefolder,
+                                        self.filenames[filenr + 1])
+                self._prefetched = (filenr + 1, self._prefetch_executor.submit(
+                    self._readcvcfile, nextpath))
         return datafromfile
 
     def __setitem__(self, filenr, data_arr):
         """Save CVC data item filenr data into an ldat file."""
+        if filenr == self._prefetched[0]:
+            # Prefetched data would be stale
+            self._prefetched = (None, None)
         cvcfile = self.filenames[filenr]
         cvcpath = os.path.join(self.filefolder, cvcfile)
         data_arr.tofile(cvcpath)
@@ -1369,15 +1568,18 @@ class CVCfiles(object):
         :return: datatype, filebegindatetime, cvcdim1, cvcdim2
         """
         cvcfilename = os.path.basename(cvcfilepath)
-        (Ymd, HMS, cvcextrest) = cvcfilename.split('_', 2)
-        datatype, restdat = cvcextrest[0:3], cvcextrest[3:]
-        (rest, _datstr) = restdat.split('.')
         _nr512 = 512
-        if datatype == 'acc':
-            rest = rest.lstrip('_')
-            (_nr512, nrrcus0, nrrcus1) = map(int, rest.split('x'))
-        filenamedatetime = datetime.datetime.strptime(Ymd + 'T' + HMS,
-                                                      '%Y%m%dT%H%M%S')
+        m = _ACC_FILE_RE.match(cvcfilename)
+        if m:
+            datatype = 'acc'
+            _nr512 = int(m.group('nrsamps'))
+        else:
+            m = _XST_CVCFILE_RE.match(cvcfilename)
+            if not m:
+                raise ValueError("Not a CVC data file name: '{}'"
+                                 .format(cvcfilename))
+            datatype = 'xst'
+        filenamedatetime = _parse_dt_compact(m.group('Ymd'), m.group('HMS'))
         # NOTE: For ACC, filename is last obstime, while for XST, it is first.
         if datatype == 'acc':
             filebegindatetime = filenamedatetime - datetime.timedelta(
@@ -1406,9 +1608,22 @@ class CVCfiles(object):
         _datatype, t_begin = self._parse_cvcfile(cvcfilepath)
         # Get cvc data from file.
         cvc_dtype = self.__get_cvc_dtype()
+        if self.memmap:
+            datafromfile = _memmap_samples(cvcfilepath, cvc_dtype)
+            return datafromfile, t_begin
         print("Reading cvcfile: {}".format(cvcfilepath))
-        with open(cvcfilepath, 'rb') as fin:
-            datafromfile = numpy.fromfile(fin, dtype=cvc_dtype)
+        # Read unbuffered straight into a preallocated array
+        with open(cvcfilepath, 'rb', buffering=0) as fin:
+            nrsamps = os.fstat(fin.fileno()).st_size // cvc_dtype.itemsize
+            datafromfile = numpy.empty(nrsamps, dtype=cvc_dtype)
+            databuf = memoryview(datafromfile).cast('B')
+            nrbytesread = 0
+            while nrbytesread < databuf.nbytes:
+                nrbytes = fin.readinto(databuf[nrbytesread:])
+                if not nrbytes:
+                    raise ValueError("CVC file {} was truncated while reading."
+                                     .format(cvcfilepath))
+                nrbytesread += nrbytes
         return datafromfile, t_begin
 
     def getnrfiles(self):
@@ -1457,6 +1672,38 @@ class CVCfiles(object):
         return data
 
 
+# Max size in bytes of an HDF5 chunk of acc2bst data, and of the chunk cache
+_H5CHUNK_MAXNBYTES = 1024**2
+_H5CACHE_NBYTES = 4*1024**2
+
+
+def _h5rowchunks(shape, itemsize, maxnbytes=_H5CHUNK_MAXNBYTES):
+    """\
+    Return HDF5 chunk shape of whole rows, for data of shape & itemsize
+
+    A chunk spans the full extent of all but the first (time) axis, and as
+    many rows as fit within `maxnbytes`, so that reading a time range reads
+    only whole, contiguous chunks.
+    """
+    if len(shape) == 0 or 0 in shape:
+        return None
+    rownbytes = itemsize * int(numpy.prod(shape[1:]))
+    nrrows = max(1, min(shape[0], maxnbytes // max(1, rownbytes)))
+    return (nrrows,) + tuple(shape[1:])
+
+
+def _h5compression():
+    """\
+    Return h5py create_dataset() compression kwargs for acc2bst data
+
+    Uses bitshuffle+LZ4 if hdf5plugin is available (reading then also needs
+    hdf5plugin), else the LZF filter that ships with h5py.
+    """
+    if canuse_hdf5plugin:
+        return dict(hdf5plugin.Bitshuffle(nelems=0, cname='lz4'))
+    return {'compression': 'lzf', 'shuffle': True}
+
+
 def readacc2bst(anacc2bstfilepath, datformat='hdf'):
     """\
     Read an acc2bst file.
@@ -1500,24 +1747,28 @@ def readacc2bst(anacc2bstfilepath, datformat='hdf'):
     anacc2bstfilename = os.path.basename(anacc2bstfilepath)
     (stnid, begin_utc_str, rcuarg, calsrc, durarg, caltabdate, acc2bst, _version
      ) = anacc2bstfilename.split('_')
-    calrunstarttime = datetime.datetime.strptime(begin_utc_str, "%Y%m%dT%H%M%S")
+    calrunstarttime = _parse_dt_compact(
+        *begin_utc_str.split('T'))
     rcumode = rcuarg[3]
     calrunduration = durarg[3:]
     acc2bstvars = {}
     if datformat == 'hdf':
-        hf = h5py.File(anacc2bstfilepath, 'r')
-        acc2bstvars['XX'] = hf['XX']
-        acc2bstvars['XY'] = hf['XY']
-        acc2bstvars['YY'] = hf['YY']
-        acc2bstvars['times'] = hf['timeaccstart']
-        bst_pols = (hf['XX'], hf['XY'], hf['YY'])
-        filestarttimes = hf['timeaccstart']
-        freqs = hf['frequency']
-        # Use calrunstarttime in filename
-        # Use calrunduration in filename
-        # Use calsrc in filename
-        caltab_id = hf.attrs['calibrationTableDate']
-        used_autocorr = hf.attrs['use_ac']
+        with h5py.File(anacc2bstfilepath, 'r', rdcc_nbytes=_H5CACHE_NBYTES
+                       ) as hf:
+            # Read datasets directly into preallocated arrays
+            for dsname in ('XX', 'XY', 'YY', 'timeaccstart', 'frequency'):
+                ds = hf[dsname]
+                acc2bstvars[dsname] = numpy.empty(ds.shape, dtype=ds.dtype)
+                if ds.size > 0:
+                    ds.read_direct(acc2bstvars[dsname])
+            # Use calrunstarttime in filename
+            # Use calrunduration in filename
+            # Use calsrc in filename
+            caltab_id = hf.attrs['calibrationTableDate']
+            used_autocorr = hf.attrs['use_ac']
+        bst_pols = (acc2bstvars['XX'], acc2bstvars['XY'], acc2bstvars['YY'])
+        filestarttimes = acc2bstvars['timeaccstart']
+        freqs = acc2bstvars['frequency']
     else:
         acc2bstfilename = '_'.join((begin_utc_str, acc2bst, rcuarg, calsrc,
                                     durarg, caltabdate))
@@ -1539,7 +1790,8 @@ def readacc2bst(anacc2bstfilepath, datformat='hdf'):
 
 def saveacc2bst(bst_pols, filestarttimes, freqs, calrunstarttime,
                 calrunduration, calsrc, caltab_id, stnid,
-                used_autocorr, saveformat="hdf5"):
+                used_autocorr, saveformat="hdf5", compress=False,
+                dtype=None):
     """\
     Save acc2bst data to file.
 
@@ -1567,6 +1819,12 @@ def saveacc2bst(bst_pols, filestarttimes, freqs, calrunstarttime,
         Was autocorrelation used in beamforming or not?
     saveformat : str
         Format to use for saving.
+    compress : bool
+        Compress the hdf5 datasets (see _h5compression()). Default False.
+    dtype : numpy dtype, optional
+        Real float dtype, e.g. numpy.float32, in which to store the hdf5 power
+        data XX & YY, with XY in the corresponding complex dtype. Default None
+        stores the data as given.
 
     See Also
     --------
@@ -1580,47 +1838,55 @@ def saveacc2bst(bst_pols, filestarttimes, freqs, calrunstarttime,
     dtlabel = 'acc2bst'
     _sb, nqz = modeparms.freq2sb(freqs[0])
     rcumode = modeparms.nqz2rcumode(nqz)
-    acc2bstbase = "{}_{}_spw{}_{}_dur{}_ct{}_v{}_{}".format(
-        stnid, calrunstarttime.strftime("%Y%m%dT%H%M%S"), rcumode, calsrc,
-        calrundurationstr, caltab_id, version, dtlabel)
+    acc2bstbase = "{}_{:%Y%m%dT%H%M%S}_spw{}_{}_dur{}_ct{}_v{}_{}".format(
+        stnid, calrunstarttime, rcumode, calsrc, calrundurationstr, caltab_id,
+        version, dtlabel)
     pntstr = ilisa.operations.directions.normalizebeamctldir(calsrc)
     # Write out the data.
     if saveformat == 'hdf5':
-        hf = h5py.File(acc2bstbase + ".hdf5", "w")
-        hf.attrs['DataDescription'] = 'LOFAR acc2bst data'
-        hf.attrs['StationID'] = stnid
-        hf.attrs['calibrationSource'] = calsrc
-        hf.attrs['pointing'] = pntstr
-        hf.attrs['ObservationStart'] = calrunstarttime.isoformat()
-        hf.attrs['ObservationDuration'] = calrundurationstr
-        hf.attrs['calibrationTableDate'] = caltab_id
-        hf.attrs['version'] = version
-        hf.attrs['use_ac'] = used_autocorr
-        hf['frequency'] = freqs
-        hf['frequency'].attrs['unit'] = "Hz"
-        hf['timeaccstart'] = filestarttimes.view('<i8')
-        hf['timeaccstart'].attrs['unit'] = "s"
-
-        hf['XX'] = bstXX
-        hf['XX'].attrs['unit'] = "arb. power"
-        hf['XY'] = bstXY
-        hf['XY'].attrs['unit'] = "arb. complex power"
-        hf['YY'] = bstYY
-        hf['YY'].attrs['unit'] = "arb. power"
-
-        hf['XX'].dims.create_scale(hf['timeaccstart'])
-        hf['XX'].dims.create_scale(hf['frequency'])
-        hf['XY'].dims.create_scale(hf['timeaccstart'])
-        hf['XY'].dims.create_scale(hf['frequency'])
-        hf['YY'].dims.create_scale(hf['timeaccstart'])
-        hf['YY'].dims.create_scale(hf['frequency'])
-        hf['XX'].dims[0].attach_scale(hf['timeaccstart'])
-        hf['XX'].dims[1].attach_scale(hf['frequency'])
-        hf['XY'].dims[0].attach_scale(hf['timeaccstart'])
-        hf['XY'].dims[1].attach_scale(hf['frequency'])
-        hf['YY'].dims[0].attach_scale(hf['timeaccstart'])
-        hf['YY'].dims[1].attach_scale(hf['frequency'])
-        hf.close()
+        with h5py.File(acc2bstbase + ".hdf5", "w") as hf:
+            hf.attrs.update({
+                'DataDescription': 'LOFAR acc2bst data',
+                'StationID': stnid,
+                'calibrationSource': calsrc,
+                'pointing': pntstr,
+                'ObservationStart': calrunstarttime.isoformat(),
+                'ObservationDuration': calrundurationstr,
+                'calibrationTableDate': caltab_id,
+                'version': version,
+                'use_ac': used_autocorr})
+            hf['frequency'] = freqs
+            hf['frequency'].attrs['unit'] = "Hz"
+            compression_kwargs = _h5compression() if compress else {}
+            timeaccstart = filestarttimes.view('<i8')
+            hf.create_dataset('timeaccstart', data=timeaccstart,
+                              chunks=_h5rowchunks(timeaccstart.shape,
+                                                  timeaccstart.dtype.itemsize),
+                              **compression_kwargs)
+            hf['timeaccstart'].attrs['unit'] = "s"
+
+            pols = ('XX', 'XY', 'YY')
+            for pol, bstpol, unit in zip(pols, (bstXX, bstXY, bstYY),
+                                         ("arb. power", "arb. complex power",
+                                          "arb. power")):
+                bstpol = numpy.asarray(bstpol)
+                if dtype is not None:
+                    poldtype = (numpy.result_type(dtype, numpy.complex64)
+                                if numpy.iscomplexobj(bstpol) else dtype)
+                    bstpol = bstpol.astype(poldtype, copy=False)
+                hf.create_dataset(pol, data=bstpol,
+                                  chunks=_h5rowchunks(bstpol.shape,
+                                                      bstpol.dtype.itemsize),
+                                  **compression_kwargs)
+                hf[pol].attrs['unit'] = unit
+
+            # Make the dimension scales once, then attach them to each pol
+            scales = (hf['timeaccstart'], hf['frequency'])
+            for scale in scales:
+                scale.make_scale()
+            for pol in pols:
+                for dimnr, scale in enumerate(scales):
+                    hf[pol].dims[dimnr].attach_scale(scale)
     else:
         numpy.save(acc2bstbase + '_times', filestarttimes)
         numpy.save(acc2bstbase + '_freqs', freqs)
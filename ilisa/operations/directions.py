@@ -219,29 +219,27 @@ def normalizebeamctldir(gendirstr):
     return beamctldirstr
 
 
-def lookupsource(src_name):
-    """
-    Lookup the pointing direction for the name of a source stored in user
-    created files.
+_SRC_DATABASE_CACHE = {'key': None, 'src_database': {}}
 
-    Parameters
-    ----------
-    src_name : str
-        Name of source.
 
-    Returns
-    -------
-    direction : tuple
-        Length 3 tuple with (az, el, ref).
+def _user_src_database():
+    """\
+    Get database of user source catalogs as dict of name to direction
 
+    The parsed catalogs are reused until some catalog file changes.
     """
-    src_database = {}
     user_srcs_dir = os.path.join(ilisa.operations.USER_DATA_DIR,
                                  'source_catalogs')
-    user_srcs_files = os.listdir(user_srcs_dir)
-
-    for user_srcs_file in user_srcs_files:
-        with open(os.path.join(user_srcs_dir, user_srcs_file)) as usf:
+    # One scandir pass gives both the catalog paths and their mtimes
+    with os.scandir(user_srcs_dir) as entries:
+        cache_key = tuple((entry.path, entry.stat().st_mtime_ns)
+                          for entry in entries)
+    user_srcs_paths = [user_srcs_path for user_srcs_path, _ in cache_key]
+    if cache_key == _SRC_DATABASE_CACHE['key']:
+        return _SRC_DATABASE_CACHE['src_database']
+    src_database = {}
+    for user_srcs_path in user_srcs_paths:
+        with open(user_srcs_path) as usf:
             srcs_cat = yaml.safe_load(usf)
         srcs_data = srcs_cat['sources']
         for source_entry in srcs_data:
@@ -252,6 +250,28 @@ def lookupsource(src_name):
             for _source_name in source_names:
                 # No conversion:
                 src_database[_source_name] = _direction_str
+    _SRC_DATABASE_CACHE['key'] = cache_key
+    _SRC_DATABASE_CACHE['src_database'] = src_database
+    return src_database
+
+
+def lookupsource(src_name):
+    """
+    Lookup the pointing direction for the name of a source stored in user
+    created files.
+
+    Parameters
+    ----------
+    src_name : str
+        Name of source.
+
+    Returns
+    -------
+    direction : tuple
+        Length 3 tuple with (az, el, ref).
+
+    """
+    src_database = _user_src_database()
     # Lookup src_name in src_database else return None
     direction = src_database.get(src_name)
     return direction
@@ -285,13 +305,15 @@ def read_sched_srccatre(filename):
                 'calcode', 'remarks']
     keywordsre = '(' + ')('.join(keywords) + ')'
     valre = '[^' + keywordsre + '($)]+'
+    # Compile keyword patterns once, rather than per catalogue entry
+    kwpatterns = [re.compile(r"{0}\s*[\s=]\s*({1})".format(kw, valre),
+                             re.MULTILINE | re.IGNORECASE) for kw in keywords]
     equinox_default = None
     for srclistentry in srclistentries:
         src_ent = {}
         equinox = None
-        for kw in keywords:
-            kifreefrmt = r"{0}\s*[\s=]\s*({1})".format(kw, valre)
-            m=re.search(kifreefrmt, srclistentry, re.MULTILINE | re.IGNORECASE)
+        for kw, kwpattern in zip(keywords, kwpatterns):
+            m = kwpattern.search(srclistentry)
             if m:
                 val = m.group(1).rstrip()
                 if kw == 'equinox':
@@ -23,6 +23,14 @@ class DRUinterface:
         dru = self._exec_dru_func()
         self.dru = dru
         self.ports = ports
+        self._local_hostname = None
+
+    @property
+    def local_hostname(self):
+        """Hostname as reported by DRU itself (fetched once then cached)"""
+        if self._local_hostname is None:
+            self._local_hostname = self.dru('hostname').rstrip()
+        return self._local_hostname
 
     def _exec_dru_func(self, background_job=False, stdoutdir='~'):
         nodeurl = '{}@{}'.format(self.user, self.hostname)
@@ -97,8 +105,7 @@ class DRUinterface:
             dumplogname = '{}_lane{}_rcu{}.log'.format(DUMPERNAME, lane,
                                                        rcumode)
             dumplogpath = os.path.join(outdumpdir, dumplogname)
-            # local_hostname = self.dru['hostname']().rstrip()
-            local_hostname = self.dru('hostname').rstrip()
+            local_hostname = self.local_hostname
             starttime = normalizetimestr(starttime)
             starttime_arg = starttime + '.000'
             datapathguess = outarg + '_' + str(port) + '.' + local_hostname + '.' \
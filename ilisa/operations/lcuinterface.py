@@ -80,6 +80,7 @@ class LCUInterface(object):
         self.DryRun = False  # DryRun means commands to LCU are not executed
         self.verbose = True  # Write out LCU commands
         self._fake_slow_conn = 0  # Fake slow connection (for tests) 0=False
+        self._calinfolist = None  # Cache of parsed 'beamctl --calinfo'
 
         # Init some OS paths:
         ## User's home dir
@@ -155,6 +156,20 @@ class LCUInterface(object):
         self.DryRun = dryrun
         return ls_lcuDumpDir, ls_ACCsrcDir
 
+    def getdatfiles(self, acc=False):
+        """\
+        Get list of data files on LCU in either data dump dir or, if acc is
+        True, ACC dir. Like getdatalist() but lists only one dir.
+        """
+        dryrun = self.DryRun
+        self.DryRun = False  # Override DryRun for this case
+        if not acc:
+            ls_dir = self._list_dat_files(self.lcuDumpDir)
+        else:
+            ls_dir = self._list_dat_files(self.ACCsrcDir)
+        self.DryRun = dryrun
+        return ls_dir
+
     def who_servicebroker(self):
         """Check who is running the Service Broker on the LCU. This is an
         indication of who is currently using the station."""
@@ -174,6 +189,28 @@ class LCUInterface(object):
             sb_user = ps_out_lns[0]
         return sb_user
 
+    def get_servicebroker_switchmode(self):
+        """Get both the Service Broker user and the station switch mode, in
+        one LCU call. See who_servicebroker() and getstationswitchmode()."""
+        if self.DryRun:
+            return None, 'local'
+        sep = '--getstationmode--'
+        out = self._exec_lcu("/bin/ps -CServiceBroker --no-headers -ouser;"
+                             " echo {}; getstationmode".format(sep))
+        ps_out, _sep, getstationmode_out = (out or '').partition(sep)
+        ps_out_lns = ps_out.splitlines()
+        if len(ps_out_lns) == 0:
+            sb_user = None
+        else:
+            sb_user = ps_out_lns[0]
+        getstationmode_words = getstationmode_out.split()
+        if getstationmode_words:
+            stationmode = getstationmode_words[-1]
+        else:
+            _LOGGER.warning("ServiceBroker not running")
+            stationmode = None
+        return sb_user, stationmode
+
     def getstationswitchmode(self):
         """Get mode of station switch. Can be 'ILT' or 'local' mode,
         or `None` if undefined."""
@@ -205,7 +242,12 @@ class LCUInterface(object):
         return filecontents
 
     def _rm(self, source, override_mock=True):
-        """Remove specified source file(s) on LCU."""
+        """Remove specified source file(s) on LCU.
+
+        source can be a path or a list of paths, which are removed in one go.
+        """
+        if not isinstance(source, str):
+            source = " ".join(source)
         dryrun = self.DryRun
         if override_mock:
             self.DryRun = False
@@ -349,10 +391,36 @@ class LCUInterface(object):
         return rspctl_cmds
 
 
-    def run_tbbctl(self, select=None, alloc=False, free=False, record=False,
-                   stop=False, mode=None, storage=None, readall=None,
-                   cepdelay=None, backgroundJOB=False):
-        """Run the tbbctl command on the LCU with arguments given."""
+    def run_batch(self, cmdlines, concurrent=False):
+        """\
+        Run a list of shell commands on the LCU in one remote session
+
+        Parameters
+        ----------
+        cmdlines: list of str
+            The shell commands.
+        concurrent: bool
+            If False, run the commands one after the other. If True, run them
+            all as background jobs and return when all have finished.
+
+        Returns
+        -------
+        output: str
+            The combined output of the commands.
+        """
+        if not cmdlines:
+            return None
+        if concurrent:
+            batch_cmdline = ' & '.join(cmdlines) + ' & wait'
+        else:
+            batch_cmdline = '; '.join(cmdlines)
+        return self._exec_lcu(batch_cmdline)
+
+    @staticmethod
+    def tbbctl_args2cmd(select=None, alloc=False, free=False, record=False,
+                        stop=False, mode=None, storage=None, readall=None,
+                        cepdelay=None):
+        """Return tbbctl command with arguments given, or None if no args."""
         tbbctl_args = ""
 
         if alloc:
@@ -376,11 +444,21 @@ class LCUInterface(object):
             tbbctl_args += " --select={}".format(select)
         if tbbctl_args != "":
             tbbctl_cmd = "tbbctl"+tbbctl_args
-            self._exec_lcu(tbbctl_cmd, backgroundJOB)
         else:
             tbbctl_cmd = None
         return tbbctl_cmd
 
+    def run_tbbctl(self, select=None, alloc=False, free=False, record=False,
+                   stop=False, mode=None, storage=None, readall=None,
+                   cepdelay=None, backgroundJOB=False):
+        """Run the tbbctl command on the LCU with arguments given."""
+        tbbctl_cmd = self.tbbctl_args2cmd(
+            select=select, alloc=alloc, free=free, record=record, stop=stop,
+            mode=mode, storage=storage, readall=readall, cepdelay=cepdelay)
+        if tbbctl_cmd is not None:
+            self._exec_lcu(tbbctl_cmd, backgroundJOB)
+        return tbbctl_cmd
+
     def mockstatistics(self, statistics, integration, duration, wait_dur=None,
                        srctype='zero'):
         """Make mock statistics data file(s)."""
@@ -536,9 +614,28 @@ class LCUInterface(object):
             # Band 30_90 not correctly implemented in "beamctl --calinfo".
             # It uses the 10_90 caltab anyways so:
             rcumode = 3
-        calinfoout =self._exec_lcu("beamctl --calinfo")
-        if self.DryRun:
+        calinfolist = self._get_calinfolist()
+        if not calinfolist:
+            # No calinfo. Return blank
             return ""
+        band = rcumode2band(rcumode)
+        for calinfolistitem in calinfolist:
+            if calinfolistitem['Band'] == band:
+                calinfo = calinfolistitem
+                break
+        return calinfo
+
+    def _get_calinfolist(self):
+        """\
+        Get 'beamctl --calinfo' output as a list of dict per antset
+
+        The output covers all bands, so it is fetched once and then reused
+        until the caltables are changed with selectCalTable(). Empty output
+        (e.g. CalServer not up yet) is not cached, so it is fetched again.
+        """
+        if self._calinfolist:
+            return self._calinfolist
+        calinfoout = self._exec_lcu("beamctl --calinfo")
         # Convert output into a list of dict per antset
         calinfolist = []
         # Strip off first initial lines and split on blank lines
@@ -552,29 +649,24 @@ class LCUInterface(object):
             # Note that it can take a while before calinfo is return,
             # should maybe have a timeout?
         calinfooutlist = (''.join(calinfooutspl)).split('\n\n')
-        if calinfooutlist[0] == '':
-            # No calinfo. Return blank
-            return ""
-        for calinfooutlistitem in calinfooutlist:
-            calinfolistitem = {}
-            for calinfolistitemline in calinfooutlistitem.split('\n'):
-                calkey, calval = calinfolistitemline.split(':', 1)
-                calkey = calkey.rstrip()
-                calval = calval.lstrip()
-                calinfolistitem[calkey] = calval
-            calinfolist.append(calinfolistitem)
-        band = rcumode2band(rcumode)
-        for calinfolistitem in calinfolist:
-            if calinfolistitem['Band'] == band:
-                calinfo = calinfolistitem
-                break
-        return calinfo
+        if calinfooutlist[0] != '':
+            for calinfooutlistitem in calinfooutlist:
+                calinfolistitem = {}
+                for calinfolistitemline in calinfooutlistitem.split('\n'):
+                    calkey, calval = calinfolistitemline.split(':', 1)
+                    calkey = calkey.rstrip()
+                    calval = calval.lstrip()
+                    calinfolistitem[calkey] = calval
+                calinfolist.append(calinfolistitem)
+        if calinfolist:
+            self._calinfolist = calinfolist
+        return calinfolist
 
     def selectCalTable(self, which='default'):
         """This is specific to an lcu which has the script SelectCalTable.sh
         with which a user can switch between different caltables.
         """
-        pass
+        self._calinfolist = None  # Caltables may change so drop cached info
 
     def turnoffLBA_LNAs(self, select="0:191"):
         """Turn-off the LNAs on LBA.
@@ -1,7 +1,10 @@
 """This package is for the parameters involved in observation modes.
 """
 import os
+import ast
+import operator
 import argparse
+import functools
 import math
 import numpy
 import datetime
@@ -509,6 +512,12 @@ def seqarg2list(seqarg):
     Return a list that is a sequence of integers corresponding to the
     sequence given by the (extended) commandline argument string
     """
+    return list(_seqarg2tuple(seqarg))
+
+
+@functools.lru_cache(maxsize=128)
+def _seqarg2tuple(seqarg):
+    # Cached since same subband & rcu seqargs get parsed repeatedly
     arglist=[]
     for el in seqarg.split(','):
         els = el.split(':')
@@ -518,7 +527,7 @@ def seqarg2list(seqarg):
         else:
             seqstep = 1
         arglist.extend(range(seqlo, seqhi+1,seqstep))
-    return arglist
+    return tuple(arglist)
 
 
 def list2seqarg(lst):
@@ -833,6 +842,29 @@ def sb2freq(sb, nqzone):
     return freq
 
 
+def sbs2freqs(sbs, nqzone):
+    """
+    Convert a sequence of subbands in a given Nyquist zone to frequencies
+
+    Vectorized version of sb2freq().
+
+    Parameters
+    ----------
+    sbs: array_like of ints
+        Subband numbers
+    nqzone: int or str
+        Nyquist zone number
+
+    Returns
+    -------
+    freqs: array of floats
+        Frequencies in Hz
+    """
+    freqs = NQFREQ_NOM * (numpy.asarray(sbs, dtype=float) / TotNrOfsb
+                          + int(nqzone))
+    return freqs
+
+
 def nqz2rcumode(nqzone, nqfreq=NQFREQ_NOM, filt_on=False):
     """\
     Convert Nyquist zone number and Nyquist frequency to RCU mode.
@@ -1060,7 +1092,12 @@ def timestr2datetime(timestr, dt_format=DATETIMESTRFMT):
         dattim += datetime.timedelta(seconds=1)
     else:
         try:
-            dattim = datetime.datetime.strptime(timestr, dt_format)
+            if (dt_format == DATETIMESTRFMT and len(timestr) == 19
+                    and timestr[10] == 'T'):
+                # Fast path: fromisoformat() is C-implemented
+                dattim = datetime.datetime.fromisoformat(timestr)
+            else:
+                dattim = datetime.datetime.strptime(timestr, dt_format)
         except:
             raise RuntimeError("Wrong datetime format.")
     return dattim
@@ -1123,6 +1160,10 @@ def normalizetimestr(timestr, dt_pformat=DATETIMESTRFMT,
     return timestr_nrm
 
 
+_LDAT_TYPES = frozenset({'acc', 'bst', 'bst-357', 'sst', 'xst', 'xst-SEPTON',
+                         'bfs'})
+
+
 def is_ldattype(obsdatatype):
     """
     Test if a string 'obsdatatype' is a type of LOFAR data
@@ -1137,15 +1178,7 @@ def is_ldattype(obsdatatype):
     _isldattype: bool
         If True, `obsdatatype` is an LDAT-type, else it is not.
     """
-    _isldattype = False
-    if (obsdatatype == 'acc' or
-            obsdatatype == 'bst' or
-            obsdatatype == 'bst-357' or
-            obsdatatype == 'sst' or
-            obsdatatype == 'xst' or
-            obsdatatype == 'xst-SEPTON' or
-            obsdatatype == 'bfs'):
-        _isldattype = True
+    _isldattype = obsdatatype in _LDAT_TYPES
     return _isldattype
 
 
@@ -1208,6 +1241,64 @@ def format_filename_from_ldattype_datetime(dattim, ldattype):
     return filename
 
 
+_NUMEXPR_BINOPS = {ast.Add: operator.add, ast.Sub: operator.sub,
+                   ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+
+def str2num(numstr):
+    """\
+    Parse string of number, or of simple arithmetic on numbers, to a number
+
+    Replaces eval() for inputs such as '3600', '0.5', '1/16' or '2*60*60'.
+    Only numeric literals with the +, -, *, / operators are accepted.
+
+    Parameters
+    ----------
+    numstr: str or int or float
+        The number, or its str representation.
+
+    Returns
+    -------
+    num: int or float
+        The number.
+
+    Raises
+    ------
+    ValueError
+        If numstr is not a number or a simple arithmetic expression.
+    """
+    if isinstance(numstr, (int, float)):
+        return numstr
+    numstr = str(numstr).strip()
+    try:
+        return int(numstr)
+    except ValueError:
+        pass
+    try:
+        return float(numstr)
+    except ValueError:
+        pass
+
+    def _eval_node(node):
+        if (isinstance(node, ast.Constant)
+                and type(node.value) in (int, float)):
+            return node.value
+        if (isinstance(node, ast.BinOp)
+                and type(node.op) in _NUMEXPR_BINOPS):
+            return _NUMEXPR_BINOPS[type(node.op)](_eval_node(node.left),
+                                                  _eval_node(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op,
+                                                        (ast.UAdd, ast.USub)):
+            operand = _eval_node(node.operand)
+            return -operand if isinstance(node.op, ast.USub) else operand
+        raise ValueError("Cannot understand number '{}'.".format(numstr))
+    try:
+        tree = ast.parse(numstr, mode='eval')
+    except SyntaxError:
+        raise ValueError("Cannot understand number '{}'.".format(numstr))
+    return _eval_node(tree.body)
+
+
 def hmsstr2deltatime(hms):
     """\
     Convert hms (hours, minutes, seconds) string to python deltatime
@@ -1237,7 +1328,7 @@ def hmsstr2deltatime(hms):
         delta_t = datetime.timedelta(hours=dt.hour, minutes=dt.minute,
                                      seconds=dt.second)
     else:
-        delta_t = datetime.timedelta(seconds=float(eval(hms)))
+        delta_t = datetime.timedelta(seconds=float(str2num(hms)))
     return delta_t
 
 
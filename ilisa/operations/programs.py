@@ -88,12 +88,6 @@ class ObsPrograms(object):
         starttime = waituntil(starttime_req, margin)
         rectime = starttime
 
-        # Necessary since fork creates multiple instances of myobs and each one
-        # will call it's __del__ on completion and __del__ shutdown...
-        shutdown = self.stationdriver.halt_observingstate_when_finished
-        self.stationdriver.halt_observingstate_when_finished = False
-        self.stationdriver.exit_check = False
-
         dir_bmctl = ilisa.monitorcontrol.directions.normalizebeamctldir(pointing)
 
         # BEGIN Dummy or hot beam start: (takes about 14sec)
@@ -146,7 +140,6 @@ class ObsPrograms(object):
             time.sleep(duration)
         sys.stdout.flush()
         self.stationdriver.stop_beam()
-        self.stationdriver.halt_observingstate_when_finished = shutdown
         return [obsinfo]
 
     def test(self, arg):
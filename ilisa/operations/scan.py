@@ -252,8 +252,6 @@ class LScan:
         elif rec_type == 'tbb':
             stndrv.do_tbb(duration_tot, freqsetup.rcubands[0])
         elif rec_type == 'dmp':
-            stndrv.halt_observingstate_when_finished = False
-            stndrv.exit_check = False
             rectime = starttime
             lanes = modeparms.getlanes(freqsetup.subbands_spw,
                                        freqsetup.bits,
@@ -321,10 +319,13 @@ class LScan:
             _scanrecpath = self.scanresult['acc'].scanrecpath
             self.stndrv.flush_acc(_scanrecpath)
             # Add their ldatinfos and write them to file
+            ldatinfo_acc0 = self.ldatinfos_acc[0]
             for filtim in leftacc_filtims:
-                self.ldatinfos_acc.append(self.ldatinfos_acc[0])
-                self.ldatinfos_acc[-1].filenametime = filtim
-                self.ldatinfos_acc[-1].write_ldat_header(_scanrecpath)
+                # Copy rather than alias 1st ldatinfo, same LCU setup
+                ldatinfo = ldatinfo_acc0.new_rspctl(ldatinfo_acc0.rspctl_cmds)
+                ldatinfo.filenametime = filtim
+                ldatinfo.write_ldat_header(_scanrecpath)
+                self.ldatinfos_acc.append(ldatinfo)
         # Create obsinfo each ACC file
         for ldatinfo in self.ldatinfos_acc:
             self.scanresult['acc'].add_obs(ldatinfo)
@@ -444,61 +445,64 @@ def do_nominal_scan(args):
         Arguments object. See main_cli().
     """
     accessconf = ilisa.operations.default_access_lclstn_conf()
-    stndrv = StationDriver(accessconf['LCU'], accessconf['DRU'],
-                           mockrun=args.mockrun)
-    stndrv._lcu_interface._fake_slow_conn = 0  # Fake slow connection for test
-    sesspath = stndrv.dru_data_root  # accessconf['DRU']['LOFARdataArchive']
-    rec_type = args.ldat_type
-    if rec_type == 'None':
-        rec_type = None
-    if args.acc:
-        sesspath = os.path.join(sesspath, 'acc')
-    elif args.bfs:
-        sesspath = os.path.join(sesspath, 'bfs')
-    else:
-        sesspath = os.path.join(sesspath, args.ldat_type)
-    freqsetup = modeparms.FreqSetup(args.freqspec)
-    # Postprocess beam to get direction
-    pointing = args.pointing
-    direction = directions.normalizebeamctldir(pointing)
-    source = 'None'
-    if not directions.pointing_str2tuple(pointing):
-        source = pointing
-    try:
-        duration_tot = float(eval(str(args.duration_tot)))
-    except NameError:
-        _LOGGER.error("Cannot understand duration='{}'.".format(args.duration_tot))
-        raise
-    # Start criteria: Time
-
-    starttime = modeparms.as_asapdatetime(args.timestart)
-    _nowtime = waituntil(starttime, datetime.timedelta(seconds=2))
-    stoptime = (_nowtime + datetime.timedelta(seconds=int(duration_tot))
-                + datetime.timedelta(seconds=0))
-    _LOGGER.info('Expected scan stop @ {}'.format(stoptime))
-    stop_cond = lambda : True  # Always True, thus wait for LCU procs to finish
-    # Initialize LScan
-    _pointing_spec = {'pointing': pointing, 'direction': direction,
-                      'source': source}
-    lscan = LScan(stndrv, rec_type, freqsetup, _pointing_spec, duration_tot,
-                  args.integration, starttime, args.acc, args.bfs,
-                  destpath=sesspath, destpath_bfs='Scans')
-    subscan = iter(lscan)
-    # Start the subscan
-    next(subscan)
-    while stop_cond():
+    with StationDriver(accessconf['LCU'], accessconf['DRU'],
+                       mockrun=args.mockrun) as stndrv:
+        # Fake slow connection for test
+        stndrv._lcu_interface._fake_slow_conn = 0
+        sesspath = stndrv.dru_data_root  # accessconf['DRU']['LOFARdataArchive']
+        rec_type = args.ldat_type
+        if rec_type == 'None':
+            rec_type = None
+        if args.acc:
+            sesspath = os.path.join(sesspath, 'acc')
+        elif args.bfs:
+            sesspath = os.path.join(sesspath, 'bfs')
+        else:
+            sesspath = os.path.join(sesspath, args.ldat_type)
+        freqsetup = modeparms.FreqSetup(args.freqspec)
+        # Postprocess beam to get direction
+        pointing = args.pointing
+        direction = directions.normalizebeamctldir(pointing)
+        source = 'None'
+        if not directions.pointing_str2tuple(pointing):
+            source = pointing
         try:
-            _LOGGER.debug('do_nominal_scan: IN SUBSCAN LOOP')
-            _ = subscan.send(stop_cond())
-        except StopIteration:
-            break
-    _LOGGER.debug('do_nominal_scan: END SUBSCAN LOOP')
-    lscan.close()
-    for res in lscan.scanresult['rec']:
-        _LOGGER.info("Saved {} scanrec here: {}"
-                     .format(res, lscan.scanresult[res].scanrecpath))
-    if not lscan.scanresult['rec']:
-        _LOGGER.info("No data recorded ('None' selected)")
+            duration_tot = float(modeparms.str2num(args.duration_tot))
+        except ValueError:
+            _LOGGER.error("Cannot understand duration='{}'."
+                          .format(args.duration_tot))
+            raise
+        # Start criteria: Time
+
+        starttime = modeparms.as_asapdatetime(args.timestart)
+        _nowtime = waituntil(starttime, datetime.timedelta(seconds=2))
+        stoptime = (_nowtime + datetime.timedelta(seconds=int(duration_tot))
+                    + datetime.timedelta(seconds=0))
+        _LOGGER.info('Expected scan stop @ {}'.format(stoptime))
+        # Always True, thus wait for LCU procs to finish
+        stop_cond = lambda : True
+        # Initialize LScan
+        _pointing_spec = {'pointing': pointing, 'direction': direction,
+                          'source': source}
+        lscan = LScan(stndrv, rec_type, freqsetup, _pointing_spec, duration_tot,
+                      args.integration, starttime, args.acc, args.bfs,
+                      destpath=sesspath, destpath_bfs='Scans')
+        subscan = iter(lscan)
+        # Start the subscan
+        next(subscan)
+        while stop_cond():
+            try:
+                _LOGGER.debug('do_nominal_scan: IN SUBSCAN LOOP')
+                _ = subscan.send(stop_cond())
+            except StopIteration:
+                break
+        _LOGGER.debug('do_nominal_scan: END SUBSCAN LOOP')
+        lscan.close()
+        for res in lscan.scanresult['rec']:
+            _LOGGER.info("Saved {} scanrec here: {}"
+                         .format(res, lscan.scanresult[res].scanrecpath))
+        if not lscan.scanresult['rec']:
+            _LOGGER.info("No data recorded ('None' selected)")
 
 
 def main_cli():
@@ -1,5 +1,7 @@
 import sys
 import os
+import copy
+import functools
 import time
 import datetime
 import shutil
@@ -20,6 +22,27 @@ OBSLOGFILE = "ilisa_cmds.log"  # Log of each ilisa_obs or ilisa_adm CLI run
 _LOGGER = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=32)
+def _freqsetup_cached(freqspec):
+    return modeparms.FreqSetup(freqspec)
+
+
+def _freqsetup(freqspec):
+    """\
+    Get FreqSetup for freqspec, reusing the parse of an earlier same freqspec
+
+    Scans in a session often share freqspecs, and each is looked at several
+    times while the session is processed.
+    """
+    try:
+        freqsetup = _freqsetup_cached(freqspec)
+    except TypeError:
+        # freqspec is unhashable, e.g. a list
+        return modeparms.FreqSetup(freqspec)
+    # Copy since callers may modify it
+    return copy.copy(freqsetup)
+
+
 def projid2meta(projectid):
     """\
     Get the project metadata for project with projectid
@@ -250,7 +273,7 @@ def lcu_services(scan):
     if beam.get('pointing'):
         return 'beam'
     elif beam.get('freqspec') and \
-            modeparms.FreqSetup(beam['freqspec'])._rcumodes[0] > 4:
+            _freqsetup(beam['freqspec'])._rcumodes[0] > 4:
         return 'tof'
     return None
 
@@ -405,7 +428,7 @@ class ScanSession(object):
                 bsx_stat = scan['bsx_stat']
                 integration = scan['integration']
                 freqspec = scan['beam']['freqspec']
-                freqsetup = modeparms.FreqSetup(freqspec)
+                freqsetup = _freqsetup(freqspec)
                 scan_dur = scan['duration']
 
                 # Calculate scan schedule fundamental timings
@@ -453,6 +476,13 @@ class ScanSession(object):
                     seconds=scan_dur) + margin_scan_start
                 _LOGGER.info('Will stop @ {}'.format(stoptime))
                 stop_cond = still_time_fun(stoptime)
+                if not bfs and not modeparms._xtract_bsx(bsx_stat) and not acc:
+                    # If no recording then simply wait until stoptime, rather
+                    # than spinning the subscan loop
+                    _sleepfor = max(0.0, (stoptime - datetime.datetime.utcnow()
+                                          ).total_seconds())
+                    _LOGGER.info('Not recording for {}s'.format(_sleepfor))
+                    time.sleep(_sleepfor)
                 stop_scan_cond = stop_cond()
                 while stop_scan_cond:
                     try:
@@ -467,12 +497,6 @@ class ScanSession(object):
                          )
                 _LOGGER.debug('scansession: END SUBSCAN LOOP')
                 lscan.close()
-                # If no recording then simply wait for duration_tot
-                if not bfs and not modeparms._xtract_bsx(bsx_stat) and not acc:
-                    _sleepfor = (datetime.timedelta(seconds=scan_dur)
-                                 + margin_scan_start)
-                    _LOGGER.info('Not recording for {}s'.format(_sleepfor))
-                    time.sleep(_sleepfor)
                 scanresult = lscan.scanresult
             scan['id'] = scanresult.get('scan_id', None)
             scanpath_scdat = scanresult.get('scanpath_scdat', None)
@@ -577,7 +601,7 @@ def check_scansess(sesmeta_in):
     for scan in sesscans['scans']:
         _freqspecarg = scan.get('beam').get('freqspec')
         try:
-            _freqspec_d = modeparms.FreqSetup(_freqspecarg).__dict__
+            _freqspec_d = _freqsetup(_freqspecarg).__dict__
         except KeyError:
             raise ValueError("'freqspec' is set incorrectly.")
     lastscan = sesscans['scans'][-1]
@@ -600,7 +624,7 @@ def print_scansess(scansess):
     nrlaneslst = []
     for scan in scansess['scans']:
         nrlaneslst.append(
-            modeparms.FreqSetup(scan.get('beam').get('freqspec')).nrlanes)
+            _freqsetup(scan.get('beam').get('freqspec')).nrlanes)
     print('# Lanes max:', max(nrlaneslst), 'min:', min(nrlaneslst))
     print('# wait_before_start:', stilltime_sess_start(scansess))
 
@@ -637,29 +661,30 @@ def obs(scansess_in, sac):
                       .format(sac['LCU']['stnid']))
         _LOGGER.error(err)
         raise RuntimeError('Could not start station driver')
-    scnsess = ScanSession(stndrv)
-    scansess_in['station'] = stndrv.get_stnid()
-    stndrv._lcu_interface._fake_slow_conn = 0  # Fake a slower connection
-    if stndrv._lcu_interface._fake_slow_conn != 0:
-        _LOGGER.warning('Faking slow connection. Delay {}s.'.format(
-            stndrv._lcu_interface._fake_slow_conn))
-    try:
-        scnsess.run_scansess(scansess_in)
-    except ValueError as err:
-        _LOGGER.error(err)
-    cmd = 'obs:' + file
-    with open(OBSLOGFILE, 'a') as lgf:
-        if mockrun:
-            priority_fld = 'M'
-        else:
-            priority_fld = '0'
-        if scnsess.failed:
-            lgf.write('FAILED ')
-        lgf.write("{} {} {} {}".format(issued_at, cli_start, priority_fld,
-                                       projectid)
-                  + " {} {} {} '{}'\n".format(stndrv.get_stnid(), cmd,
-                                              scnsess.session_id,
-                                              scansess_in.get('note', '')))
+    with stndrv:
+        scnsess = ScanSession(stndrv)
+        scansess_in['station'] = stndrv.get_stnid()
+        stndrv._lcu_interface._fake_slow_conn = 0  # Fake a slower connection
+        if stndrv._lcu_interface._fake_slow_conn != 0:
+            _LOGGER.warning('Faking slow connection. Delay {}s.'.format(
+                stndrv._lcu_interface._fake_slow_conn))
+        try:
+            scnsess.run_scansess(scansess_in)
+        except ValueError as err:
+            _LOGGER.error(err)
+        cmd = 'obs:' + file
+        with open(OBSLOGFILE, 'a') as lgf:
+            if mockrun:
+                priority_fld = 'M'
+            else:
+                priority_fld = '0'
+            if scnsess.failed:
+                lgf.write('FAILED ')
+            lgf.write("{} {} {} {}".format(issued_at, cli_start,
+                                           priority_fld, projectid)
+                      + " {} {} {} '{}'\n".format(
+                          stndrv.get_stnid(), cmd, scnsess.session_id,
+                          scansess_in.get('note', '')))
     return scnsess
 
 
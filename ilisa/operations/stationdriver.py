@@ -3,6 +3,10 @@
 via one LCUinterface instance and one DRUinterface instance.
 This package knows about the data archive and
 should not run anything directly on LCU."""
+import asyncio
+import re
+import select
+import shlex
 import shutil
 import sys
 import time
@@ -10,7 +14,7 @@ import datetime
 import subprocess
 import os
 from pathlib import Path
-import multiprocessing
+import concurrent.futures
 import argparse
 import logging
 
@@ -23,6 +27,16 @@ import ilisa.operations.modeparms as modeparms
 import ilisa.operations.data_io as data_io
 
 _LOGGER = logging.getLogger(__name__)
+_OPSALLOWED_CACHE_DUR = 10.0  # Seconds to reuse is_operationsallowed() result
+# Allowed characters in LCU source paths (globs but no shell metachars)
+_LCU_SRCPATH_RE = re.compile(r'[\w./*?\-]+')
+# UDP ports for TBBraw2h5 to capture TBB data streams on
+TBB_PORTS = tuple(range(31664, 31676))
+_TBB_PORT_ARGS = tuple(arg for port in TBB_PORTS for arg in ("-P", str(port)))
+# ssh options for scp so that successive moves share one connection
+_SCP_MASTER_OPTS = ["-o", "ControlMaster=auto", "-o", "ControlPersist=60s",
+                    "-o", "ControlPath=" + ilisa.operations.USER_CACHE_DIR
+                    + "cm-%r@%h:%p"]
 
 
 class StationDriver(object):
@@ -51,6 +65,7 @@ class StationDriver(object):
             If LCU could not be accessed.
         """
         self.mockrun = mockrun
+        self._opsallowed_cache = None  # (monotonic time, is_opsallowed)
         if not accessconf_lcu or not accessconf_dru:
             accessconf = ilisa.operations.default_access_lclstn_conf()
             if not accessconf_lcu:
@@ -116,6 +131,7 @@ class StationDriver(object):
         self.beamstart = None
         # Initialize field, name of field station pointing at
         self.field = ''
+        self._closed = False
 
     def is_operationsallowed(self):
         """
@@ -129,20 +145,26 @@ class StationDriver(object):
         -------
         bool
         """
-        serviceuser = self._lcu_interface.who_servicebroker()
+        if self._opsallowed_cache is not None:
+            cachedtime, opsallowed = self._opsallowed_cache
+            if time.monotonic() - cachedtime < _OPSALLOWED_CACHE_DUR:
+                return opsallowed
+        serviceuser, stationswitchmode = \
+            self._lcu_interface.get_servicebroker_switchmode()
 
         if serviceuser is None or serviceuser == self._lcu_interface.user:
-            stationswitchmode = self._lcu_interface.getstationswitchmode()
             if stationswitchmode == 'local':
-                return True
+                opsallowed = True
             else:
                 _LOGGER.warning("Station is not in stand-alone mode.")
-                return False
+                opsallowed = False
         else:
             _LOGGER.warning(
                 """Someone else ({}) is using LCU (You are running as {})"""
                 .format(serviceuser, self._lcu_interface.user))
-            return False
+            opsallowed = False
+        self._opsallowed_cache = (time.monotonic(), opsallowed)
+        return opsallowed
 
     def is_inobservingstate(self):
         """Check if station is in main observing state for user.
@@ -181,6 +203,7 @@ class StationDriver(object):
         self._lcu_interface.cleanup()  # Could be leftovers from previous runs
 
         swlevel_changed = self._lcu_interface.set_swlevel(3)
+        self._opsallowed_cache = None
         if swlevel_changed and warmup:
             # Dummy or hot beam start: (takes about 10sec)
             # This seems necessary: first beamctl after going to swlevel 3
@@ -204,15 +227,21 @@ class StationDriver(object):
         self.stop_beam()
         if self.is_operationsallowed():
             self._lcu_interface.set_swlevel(0)
+            self._opsallowed_cache = None
             # Cleanup any data left on LCU.
             self._lcu_interface.cleanup()
 
-    def __del__(self):
+    def close(self):
         """
-        Delete this object
+        Close this StationDriver
 
-        May shutdown observation mode on station.
+        May shutdown observation mode on station, depending on
+        halt_observingstate_when_finished and exit_check.
+        It is called on exiting a with-statement with this object.
         """
+        if self._closed:
+            return
+        self._closed = True
         if self._lcu_interface:
             # If LCU is connected, do the following:
             # Stop any hanging beams running (can happen if an Exception occurs)
@@ -226,39 +255,103 @@ class StationDriver(object):
                             "You are leaving station in swlevel {} != 0"
                             .format(swlevel))
 
-    def movefromlcu(self, source, dest, recursive=False):
-        """Move file(s) off LCU to DRU."""
-        move_cmdline = ["scp", "-3"]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # Shutdown over ssh during garbage collection is unreliable, so it is
+        # done in close() instead
+        if not getattr(self, '_closed', True):
+            _LOGGER.warning("StationDriver was not closed;"
+                            " use close() or a with-statement.")
+
+    def _scp_cmdline(self, source, dest, recursive=False):
+        """Build scp cmdline to move source on LCU to dest on DRU."""
+        move_cmdline = ["scp", "-3"] + _SCP_MASTER_OPTS
         if recursive:
             move_cmdline.append("-r")
         src_arg = self._lcu_interface.url + ":" + source
         move_cmdline.append(src_arg)
         if self.use_sshfs or self._dru_interface.hostname == 'localhost':
             dst_arg = dest
-            if not os.path.exists(dest):
-                os.makedirs(dest)
+            os.makedirs(dest, exist_ok=True)
         else:
             dst_arg = self._dru_interface.url + ":" + dest
             # TODO: mkdir on DRU
         move_cmdline.append(dst_arg)
+        return move_cmdline
+
+    def _check_lcu_srcpath(self, source):
+        """Check that source is a plain path in one of the LCU data dirs,
+        since it is also passed to a remote shell for removal."""
+        datadirs = (self._lcu_interface.lcuDumpDir,
+                    self._lcu_interface.ACCsrcDir)
+        if (not _LCU_SRCPATH_RE.fullmatch(source)
+                or '..' in source or not source.startswith(datadirs)):
+            raise ValueError("Not allowed to move '{}' off LCU"
+                             .format(source))
+
+    async def _movefromlcu_async(self, source, dest, recursive=False):
+        """Spawn scp of file(s) off LCU to DRU and wait for it to finish."""
+        move_cmdline = self._scp_cmdline(source, dest, recursive)
         cmdprompt = "spawn on driver>"
         if self._lcu_interface.verbose:
             _LOGGER.info("{} {}".format(cmdprompt, " ".join(move_cmdline)))
-        proc = subprocess.Popen(move_cmdline)
-        proc.wait()  # Since cleanup() after might zap data before completion
-        self._lcu_interface._rm(source)
+        proc = await asyncio.create_subprocess_exec(*move_cmdline)
+        return await proc.wait()
+
+    async def _run_moves(self, moves, recursive=False):
+        return await asyncio.gather(
+            *[self._movefromlcu_async(source, dest, recursive)
+              for source, dest in moves])
+
+    def movesfromlcu(self, moves, recursive=False):
+        """\
+        Move several file(s) off LCU to DRU concurrently
+
+        Parameters
+        ----------
+        moves : list of tuple
+            List of (source, dest) pairs, where source is the path on LCU and
+            dest is the destination folder on DRU.
+        recursive : bool
+            Whether to copy sources recursively.
+        """
+        if not moves:
+            return
+        for source, _dest in moves:
+            self._check_lcu_srcpath(source)
+        # ControlPath socket lives in cache dir
+        os.makedirs(ilisa.operations.USER_CACHE_DIR, exist_ok=True)
+        returncodes = asyncio.run(self._run_moves(moves, recursive))
+        # Remove only after all moves completed, so data is not zapped,
+        # and keep sources that failed to copy
+        moved = []
+        for (source, _dest), returncode in zip(moves, returncodes):
+            if returncode == 0:
+                moved.append(source)
+            else:
+                _LOGGER.error("Could not move {} off LCU (scp exit {})."
+                              " Leaving it on LCU.".format(source,
+                                                           returncode))
+        if moved:
+            self._lcu_interface._rm(moved)
+
+    def movefromlcu(self, source, dest, recursive=False):
+        """Move file(s) off LCU to DRU."""
+        self.movesfromlcu([(source, dest)], recursive)
 
     def get_datafiletimes(self, acc=False):
         """\
         Get filetime names of datafiles on LCU sort chronologically
         """
-        dd_dir, acc_dir = self._lcu_interface.getdatalist()
+        # Only list the dir needed, since each listing is an LCU round-trip
+        the_dir = self._lcu_interface.getdatfiles(acc=acc)
         # Assumes files in datadump dir have
         # format YYYYmmdd_HHMMSS_[bsx]st_[rcu???|00[X|Y]].dat
-        if not acc:
-            the_dir = dd_dir
-        else:
-            the_dir = acc_dir
         _filetimenames = set()
         for filename in the_dir:
             obsdate, obstime, _obssuff = filename.split('_', 2)
@@ -550,9 +643,14 @@ class StationDriver(object):
                                        filetimestamps[0] + '*.dat')
             # Create obsinfo each ACC file
             rspctl_cmds = []  # ACC doesn't have any rspctl cmds
-            ldatinfo_acc = data_io.LDatInfo(
-                'acc', self.rcusetup_cmds, self.beamctl_cmds,
-                rspctl_cmds)
+            if firstacc:
+                ldatinfo_acc0 = data_io.LDatInfo(
+                    'acc', self.rcusetup_cmds, self.beamctl_cmds,
+                    rspctl_cmds)
+                ldatinfo_acc = ldatinfo_acc0
+            else:
+                # LCU setup is same for all ACC files so don't reparse it
+                ldatinfo_acc = ldatinfo_acc0.new_rspctl(rspctl_cmds)
             ldatinfo_acc.filenametime = filetimestamps[0]
             if firstacc:
                 obsinfo = {
@@ -643,6 +741,7 @@ class StationDriver(object):
                 "Increasing total duration to {}s.".format(duration_tot))
             rep = 1
         filenametime_first = ''
+        ldatinfo_first = None
         # Repeat rep times (freq sweep)
         for _itr in range(rep):
             # Sweep through subbands the sweep_sbs list
@@ -651,9 +750,14 @@ class StationDriver(object):
                 rspctl_cmds = \
                     self._lcu_interface.run_rspctl_statistics(
                         bsxtype, integration, duration_file, xst_subband)
-                ldatinfo = data_io.LDatInfo(bsxtype, rcusetup_cmds,
-                                            beamctl_cmds, rspctl_cmds,
-                                            septonconf=self.septonconf)
+                if ldatinfo_first is None:
+                    ldatinfo = data_io.LDatInfo(bsxtype, rcusetup_cmds,
+                                                beamctl_cmds, rspctl_cmds,
+                                                septonconf=self.septonconf)
+                    ldatinfo_first = ldatinfo
+                else:
+                    # Only rspctl_cmds change over the sweep
+                    ldatinfo = ldatinfo_first.new_rspctl(rspctl_cmds)
                 ft_last = self.get_datafiletimes()[-1]
                 ldatinfo.filenametime = ft_last
                 if not filenametime_first:
@@ -818,19 +922,17 @@ class StationDriver(object):
 
     def _setupTBBs(self):
         """Setup transient buffer boards and start recording."""
-        print("In setupTBBs: Freeing TBBs")
-        self._lcu_interface.run_tbbctl(free=True)
-        print("In setupTBBs: Setting TBB transient mode on rspctl")
-        self._lcu_interface.run_rspctl(tbbmode='transient')
-        time.sleep(1)
-        print("In setupTBBs: Allocating TBBs")
-        self._lcu_interface.run_tbbctl(alloc=True)
-        time.sleep(1)
-        print("In setupTBBs: Setting TBB transient mode on tbbctl")
-        self._lcu_interface.run_tbbctl(mode='transient')
-        time.sleep(1)
-        print("In setupTBBs: Start TBB recording")
-        self._lcu_interface.run_tbbctl(record=True)
+        tbbctl_args2cmd = self._lcu_interface.tbbctl_args2cmd
+        # Settling waits are done on LCU so all steps go in one LCU session
+        settle_cmd = "sleep 1"
+        print("In setupTBBs: Freeing TBBs, setting transient mode,"
+              " allocating TBBs and starting TBB recording")
+        self._lcu_interface.run_batch([
+            tbbctl_args2cmd(free=True),
+            "rspctl --tbbmode=transient", settle_cmd,
+            tbbctl_args2cmd(alloc=True), settle_cmd,
+            tbbctl_args2cmd(mode='transient'), settle_cmd,
+            tbbctl_args2cmd(record=True)])
         print("In setupTBBs: Finished setting up TBBs & started recording")
 
     def _freezeTBBdata(self):
@@ -849,44 +951,25 @@ class StationDriver(object):
         nrpages = str(int(duration_scan*2*Nqfreq/1024))
         # One page is 1024 samples.
         # Normal sampling frequency is 200MHz
-        self._lcu_interface.run_tbbctl(select='0:15,16:31,32:47',
-                                       storage='lofarA1')
-        self._lcu_interface.run_tbbctl(select='48:63,64:79,80:95',
-                                       storage='lofarA2')
-        self._lcu_interface.run_tbbctl(select='96:111,112:127,128:143',
-                                       storage='lofarA3')
-        self._lcu_interface.run_tbbctl(select='144:159,160:175,176:191',
-                                       storage='lofarA4')
-
-        self._lcu_interface.run_tbbctl(cepdelay=str(udpdelay))
-
-        self._lcu_interface.run_tbbctl(select='0:15', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='48:63', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='96:111', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='144:159', readall=nrpages,
-                                       backgroundJOB='locally')
-
-        self._lcu_interface.run_tbbctl(select='16:31', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='64:79', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='112:127', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='160:175', readall=nrpages,
-                                       backgroundJOB='locally')
-
-        self._lcu_interface.run_tbbctl(select='32:47', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='80:95', readall=nrpages,
-                                       backgroundJOB='locally')
-        self._lcu_interface.run_tbbctl(select='128:143', readall=nrpages,
-                                       backgroundJOB='locally')
-        # Last one is not put in background so the parent process blocks
-        # until finished.
-        self._lcu_interface.run_tbbctl(select='176:191', readall=nrpages)
+        tbbctl_args2cmd = self._lcu_interface.tbbctl_args2cmd
+        # Set up storage & delay
+        setup_cmds = [
+            tbbctl_args2cmd(select='0:15,16:31,32:47', storage='lofarA1'),
+            tbbctl_args2cmd(select='48:63,64:79,80:95', storage='lofarA2'),
+            tbbctl_args2cmd(select='96:111,112:127,128:143',
+                            storage='lofarA3'),
+            tbbctl_args2cmd(select='144:159,160:175,176:191',
+                            storage='lofarA4'),
+            tbbctl_args2cmd(cepdelay=str(udpdelay))]
+        # then read out all TBB boards concurrently, waiting for all to finish
+        readall_selects = ['0:15', '48:63', '96:111', '144:159',
+                           '16:31', '64:79', '112:127', '160:175',
+                           '32:47', '80:95', '128:143', '176:191']
+        readall_cmds = [tbbctl_args2cmd(select=select, readall=nrpages)
+                        for select in readall_selects]
+        readall_cmd = ' & '.join(readall_cmds) + ' & wait'
+        # all in one LCU session
+        self._lcu_interface.run_batch(setup_cmds + [readall_cmd])
 
     def do_tbb(self, duration_scan, band, start_after=0, observer="",
                project=""):
@@ -909,10 +992,12 @@ class StationDriver(object):
         freq0 = (freqlo+freqhi)/2.0
         actualfb = modeparms.FreqSetup(freq0)
         antset = actualfb.antsets[0]
-        self.streambeams(actualfb, pointing)
-
-        print("Setting up TBBs")
-        self._setupTBBs()
+        # Set up TBBs while beam is being started, since they are independent
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            print("Setting up TBBs")
+            setuptbbs = executor.submit(self._setupTBBs)
+            self.streambeams(actualfb, pointing)
+            setuptbbs.result()
 
         print("Will start TBB recording in {}s".format(start_after))
         time.sleep(start_after)
@@ -922,17 +1007,15 @@ class StationDriver(object):
         print("Sending trigger to TBBs")
         self._freezeTBBdata()
 
-        # Start data capture process locally
-        dalcap = \
-            multiprocessing.Process(target=capture_data_DAL1,
-                                    args=(self.tbbraw2h5cmd, self.tbbh5dumpdir,
-                                          observer, antset, project,
-                                          observationID, False))
-        dalcap.start()
+        # Start data capture process locally, in background so it gets ready
+        # while the LCU session streaming the data is being set up
+        dalcap = capture_data_DAL1(self.tbbraw2h5cmd, self.tbbh5dumpdir,
+                                   observer, antset, project, observationID,
+                                   background=True)
 
         print("Streaming {}s of TBB data out of LCU".format(duration_scan))
         self._startTBBdataStream(float(duration_scan))
-        dalcap.join()
+        _check_dalcap_exit(dalcap)
 
     def init_scan(self, scan_id, scanroot=None, destsubpath_bfs=None,
                   bsx_stat=False):
@@ -1050,33 +1133,77 @@ def _is_sshfs_mounted(dru_mntpnt):
 
 def capture_data_DAL1(tbbraw2h5cmd, TBBh5dumpDir, observer, antennaSet,
                       project, observationID, background=False):
-    """Start process on DPU to capture streamed TBB data on LCU."""
+    """Start process on DPU to capture streamed TBB data on LCU.
+    Returns the process' Popen object, which, if background is True, may
+    still be running."""
     if background:
         ground = 'bg'
-        grdcmd = '&'
     else:
         ground = 'fg'
-        grdcmd = ''
     print("Starting TBBraw2h5 ({})".format(ground))
     if observer == '':
         observer = 'Null'
     if project == '':
         project = 'Null'
-    cmdline = ("cd "+TBBh5dumpDir+"; "
-                     + " export LD_LIBRARY_PATH=/mnt/old/usr/lib/ ; "
-                     + tbbraw2h5cmd
-                     + " "
-                     + " --observer="+observer
-                     + " --antennaSet="+antennaSet
-                     + " --project="+project
-                     + " --observationID="+observationID
-                     + " -P 31664 -P 31665 -P 31666 "
-                     + " -P 31667 -P 31668 -P 31669 "
-                     + " -P 31670 -P 31671 -P 31672 "
-                     + " -P 31673 -P 31674 -P 31675 "
-                     + grdcmd)
-    print("DPU> {}".format(cmdline))
-    subprocess.call(cmdline, shell=True)
+    cmdargs = (shlex.split(tbbraw2h5cmd)
+               + ["--observer="+observer,
+                  "--antennaSet="+antennaSet,
+                  "--project="+project,
+                  "--observationID="+observationID]
+               + list(_TBB_PORT_ARGS))
+    env = dict(os.environ, LD_LIBRARY_PATH='/mnt/old/usr/lib/')
+    print("DPU> cd {}; {}".format(TBBh5dumpDir, " ".join(cmdargs)))
+    proc = subprocess.Popen(cmdargs, cwd=TBBh5dumpDir, env=env)
+    if not background:
+        _check_dalcap_exit(proc)
+    return proc
+
+
+def wait_capture(proc, timeout=None):
+    """\
+    Wait for capture process to finish
+
+    On Linux this waits on a pidfd of the process, so it sleeps until the
+    process exits rather than polling it as Popen.wait(timeout) does.
+
+    Parameters
+    ----------
+    proc : subprocess.Popen
+        The capture process, e.g. as returned by capture_data_DAL1().
+    timeout : float, optional
+        Maximum time in seconds to wait. If None, wait until finished.
+
+    Returns
+    -------
+    returncode : int or None
+        Exit code of process, or None if it is still running at timeout.
+    """
+    if proc.returncode is not None:
+        return proc.returncode
+    try:
+        pidfd = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        # No pidfd support (e.g. not Linux>=5.3 or Python>=3.9)
+        try:
+            return proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return None
+    try:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+        if not poller.poll(None if timeout is None else timeout*1000):
+            return None
+    finally:
+        os.close(pidfd)
+    return proc.wait()  # Reap the exited process
+
+
+def _check_dalcap_exit(proc):
+    """Wait for TBBraw2h5 process proc to finish, and log if it failed."""
+    returncode = wait_capture(proc)
+    if returncode != 0:
+        _LOGGER.error("TBBraw2h5 exited with code {}".format(returncode))
+    return returncode
 
 
 def waituntil(starttime_req, margin=datetime.timedelta(seconds=0)):
@@ -1187,24 +1314,25 @@ def main_cli():
         _LOGGER.critical("No default access config for local station {}"
                          .format(args.station))
         sys.exit()
-    stndrv = StationDriver(accessconf['LCU'], accessconf['DRU'],
-                           mockrun=args.mockrun)
-    starttime = modeparms.timestr2datetime(args.time)
-    waituntil(starttime, stndrv._time2startup_hint(args.admcmd))
-    # Dispatch admin commands
-    _LOGGER.info('ilisa_adm {} -t{} -s{}'.format(args.admcmd, args.time, args.station))
-    if args.admcmd == 'boot':
-        boot(stndrv)
-    elif args.admcmd == 'idle':
-        idle(stndrv)
-    elif args.admcmd == 'handback':
-        handback(stndrv)
-    elif args.admcmd == 'checkobs':
-        checkobs(stndrv)
-    else:
-        err_mes = "No such command: {}".format(args.admcmd)
-        _LOGGER.critical(err_mes)
-        sys.exit(2)
+    with StationDriver(accessconf['LCU'], accessconf['DRU'],
+                       mockrun=args.mockrun) as stndrv:
+        starttime = modeparms.timestr2datetime(args.time)
+        waituntil(starttime, stndrv._time2startup_hint(args.admcmd))
+        # Dispatch admin commands
+        _LOGGER.info('ilisa_adm {} -t{} -s{}'.format(args.admcmd, args.time,
+                                                     args.station))
+        if args.admcmd == 'boot':
+            boot(stndrv)
+        elif args.admcmd == 'idle':
+            idle(stndrv)
+        elif args.admcmd == 'handback':
+            handback(stndrv)
+        elif args.admcmd == 'checkobs':
+            checkobs(stndrv)
+        else:
+            err_mes = "No such command: {}".format(args.admcmd)
+            _LOGGER.critical(err_mes)
+            sys.exit(2)
 
 
 if __name__ == "__main__":